@@ -0,0 +1,94 @@
+"""
+Persistent store of articles already grouped in previous runs.
+
+Articles are identified by their canonical link plus a hash of their title and
+content, so a feed that republishes an item unchanged is recognised while an
+edited item is treated as new. The index lives in SQLite and is mirrored in an
+in-memory set for constant-time lookups during a run.
+"""
+
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+# Query parameters that only carry tracking information
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid')
+
+
+def canonicalize_link(link: str) -> str:
+    """Normalise a link so trivially different URLs of the same article compare equal."""
+    parts = urlsplit(link.strip())
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    ]
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(sorted(query)), ''))
+
+
+def content_hash(article: Dict[str, str]) -> str:
+    """Hash the title and content of an article."""
+    payload = f"{article.get('title', '')}\n{article.get('content', '')}"
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def article_key(article: Dict[str, str]) -> Tuple[str, str]:
+    """Return the (canonical link, content hash) key of an article."""
+    return canonicalize_link(article.get('link', '')), content_hash(article)
+
+
+class SeenArticleStore:
+    """SQLite-backed index of articles that were already grouped and saved."""
+
+    def __init__(self, db_path: str, retention_days: int = 30):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.db_path))
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS seen_articles ("
+            "link TEXT NOT NULL, content_hash TEXT NOT NULL, last_seen REAL NOT NULL, "
+            "PRIMARY KEY (link, content_hash))"
+        )
+        if retention_days:
+            cutoff = time.time() - retention_days * 86400
+            removed = self.connection.execute("DELETE FROM seen_articles WHERE last_seen < ?", (cutoff,)).rowcount
+            if removed:
+                logger.info("Expired %d entries from seen-article store", removed)
+        self.connection.commit()
+        self._seen: Set[Tuple[str, str]] = set(
+            self.connection.execute("SELECT link, content_hash FROM seen_articles")
+        )
+        logger.info("Loaded %d seen articles from %s", len(self._seen), self.db_path)
+
+    def __contains__(self, article: Dict[str, str]) -> bool:
+        return article_key(article) in self._seen
+
+    def split(self, articles: List[Dict[str, str]]) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+        """Split articles into (new, seen) lists, preserving order."""
+        new_articles, seen_articles = [], []
+        for article in articles:
+            (seen_articles if article in self else new_articles).append(article)
+        return new_articles, seen_articles
+
+    def mark_seen(self, articles: Iterable[Dict[str, str]]) -> None:
+        """Record articles as processed."""
+        now = time.time()
+        rows = [(link, digest, now) for link, digest in map(article_key, articles)]
+        self.connection.executemany(
+            "INSERT INTO seen_articles (link, content_hash, last_seen) VALUES (?, ?, ?) "
+            "ON CONFLICT (link, content_hash) DO UPDATE SET last_seen = excluded.last_seen",
+            rows
+        )
+        self.connection.commit()
+        self._seen.update((link, digest) for link, digest, _ in rows)
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self.connection.close()
@@ -0,0 +1,213 @@
+"""
+Offline batch jobs for llm_processor.
+
+Instead of rewriting groups one request at a time, all prompts of a run can be
+written to a JSONL batch file (one OpenAI batch-format request per line, with
+the group file stem and content hash as custom_id), submitted to a batch
+backend and collected in a later run. Pending jobs are tracked in a JSON state file so a collect run
+knows what to poll and which group each result belongs to.
+
+Backends:
+- LocalFileBatchBackend keeps jobs in a local directory and completes them
+  with a callable when polled; it stands in for a provider batch API offline
+  and records which provider and model answered each request.
+- OpenAIBatchBackend uses the OpenAI Batch API through the official client.
+"""
+
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+
+def write_batch_file(path: str, requests: List[Dict[str, Any]]) -> None:
+    """Write batch requests ({'custom_id', 'body'}) as an OpenAI batch-format JSONL file."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        for request in requests:
+            line = {'custom_id': request['custom_id'], 'method': 'POST', 'url': BATCH_ENDPOINT,
+                    'body': request['body']}
+            file.write(json.dumps(line, ensure_ascii=False) + '\n')
+
+
+def parse_batch_output(lines: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Map custom_id to the result of each request in a batch output file; failed requests map to None.
+
+    A result holds the completion text as 'content' and, when the output
+    records them, the 'provider' and 'model' that answered; otherwise those are None.
+    """
+    results: Dict[str, Optional[Dict[str, Any]]] = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        try:
+            body = item['response']['body']
+            results[item['custom_id']] = {'content': body['choices'][0]['message']['content'],
+                                          'provider': body.get('provider'),
+                                          'model': body.get('model') if body.get('provider') else None}
+        except (KeyError, IndexError, TypeError):
+            logger.warning("Batch request %s failed: %s", item.get('custom_id'), item.get('error'))
+            results[item.get('custom_id')] = None
+    return results
+
+
+class BatchBackend:
+    """Interface of batch backends."""
+
+    name = "base"
+
+    def submit(self, batch_path: str) -> str:
+        """Submit a JSONL batch file and return the job id."""
+        raise NotImplementedError
+
+    def status(self, job_id: str) -> str:
+        """Return 'pending', 'completed' or 'failed'."""
+        raise NotImplementedError
+
+    def fetch_results(self, job_id: str) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Return the result of every request of a completed job, as parsed by parse_batch_output."""
+        raise NotImplementedError
+
+
+class LocalFileBatchBackend(BatchBackend):
+    """Directory-based batch backend that completes jobs with a callable when they are polled.
+
+    The callable receives the request body and returns the completion text
+    with the provider and model that produced it, or None if it failed.
+    """
+
+    name = "local"
+
+    def __init__(self, directory: str,
+                 complete: Optional[Callable[[Dict[str, Any]], Optional[Tuple[str, str, str]]]] = None):
+        self.directory = Path(directory)
+        self.complete = complete
+
+    def submit(self, batch_path: str) -> str:
+        job_id = f"local_{uuid.uuid4().hex[:12]}"
+        job_dir = self.directory / job_id
+        job_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(batch_path, job_dir / 'input.jsonl')
+        return job_id
+
+    def status(self, job_id: str) -> str:
+        job_dir = self.directory / job_id
+        if (job_dir / 'output.jsonl').exists():
+            return 'completed'
+        if not (job_dir / 'input.jsonl').exists():
+            return 'failed'
+        if self.complete is None:
+            return 'pending'
+        self._run(job_dir)
+        return 'completed'
+
+    def _run(self, job_dir: Path) -> None:
+        """Complete every request of a job and write the output file atomically."""
+        output_lines = []
+        with open(job_dir / 'input.jsonl', 'r', encoding='utf-8') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                completion = self.complete(request['body'])
+                if completion is None:
+                    result = {'custom_id': request['custom_id'], 'response': None,
+                              'error': {'message': 'completion failed'}}
+                else:
+                    text, provider, model = completion
+                    result = {'custom_id': request['custom_id'], 'error': None, 'response': {
+                        'status_code': 200,
+                        'body': {'provider': provider, 'model': model,
+                                 'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}}]}
+                    }}
+                output_lines.append(json.dumps(result, ensure_ascii=False))
+        tmp_path = job_dir / 'output.jsonl.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(output_lines) + '\n')
+        os.replace(tmp_path, job_dir / 'output.jsonl')
+
+    def fetch_results(self, job_id: str) -> Dict[str, Optional[Dict[str, Any]]]:
+        with open(self.directory / job_id / 'output.jsonl', 'r', encoding='utf-8') as file:
+            return parse_batch_output(file.readlines())
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """Batch backend for the OpenAI Batch API."""
+
+    name = "openai"
+
+    def __init__(self, client: Any, completion_window: str = "24h"):
+        self.client = client
+        self.completion_window = completion_window
+
+    def submit(self, batch_path: str) -> str:
+        with open(batch_path, 'rb') as file:
+            batch_file = self.client.files.create(file=file, purpose='batch')
+        batch = self.client.batches.create(input_file_id=batch_file.id, endpoint=BATCH_ENDPOINT,
+                                           completion_window=self.completion_window)
+        return batch.id
+
+    def status(self, job_id: str) -> str:
+        batch = self.client.batches.retrieve(job_id)
+        if batch.status == 'completed':
+            return 'completed'
+        if batch.status in ('failed', 'expired', 'cancelled'):
+            return 'failed'
+        return 'pending'
+
+    def fetch_results(self, job_id: str) -> Dict[str, Optional[Dict[str, Any]]]:
+        batch = self.client.batches.retrieve(job_id)
+        if not batch.output_file_id:
+            return {}
+        return parse_batch_output(self.client.files.content(batch.output_file_id).text.splitlines())
+
+
+class BatchJobStore:
+    """JSON-backed record of submitted batch jobs that have not been collected yet."""
+
+    def __init__(self, state_path: str):
+        self.state_path = Path(state_path)
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        if self.state_path.exists():
+            try:
+                with open(self.state_path, 'r', encoding='utf-8') as file:
+                    self.jobs = json.load(file)
+            except (json.JSONDecodeError, OSError) as e:
+                logger.warning("Ignoring unreadable batch job state %s: %s", self.state_path, e)
+
+    def pending_ids(self) -> set:
+        """Return the custom ids of all requests in pending jobs."""
+        return {custom_id for job in self.jobs.values() for custom_id in job['requests']}
+
+    def add(self, job_id: str, backend: str, requests: Dict[str, Dict[str, Any]],
+            settings: Dict[str, Any]) -> None:
+        """Record a submitted job with what is needed to ingest each of its results."""
+        self.jobs[job_id] = {'backend': backend, 'submitted_at': time.time(),
+                             'requests': requests, 'settings': settings}
+        self.save()
+
+    def remove(self, job_id: str) -> None:
+        """Forget a collected or failed job."""
+        self.jobs.pop(job_id, None)
+        self.save()
+
+    def save(self) -> None:
+        """Atomically write the job state to disk."""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_name(self.state_path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(self.jobs, file, ensure_ascii=False)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.error("Error saving batch job state to %s: %s", self.state_path, e)
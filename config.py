@@ -8,6 +8,9 @@ import yaml
 CONFIG_PATH = Path("config.yaml")
 FEEDS_PATH = Path("input/feeds.txt")
 
+# Concurrent LLM requests of llm_processor.py, also its fallback when the key is missing
+DEFAULT_MAX_IN_FLIGHT = 4
+
 
 
 def load_config(config_file=CONFIG_PATH):
@@ -29,6 +32,23 @@ def ensure_default_config(config_data):
     """Ensure all required keys are in the config_data with default values."""
     defaults = {
         'input_feeds_path': "input/feeds.txt",
+        'fetching': {
+            'max_concurrency': 8,
+            'per_host_limit': 2,
+            'timeout': 20,
+            'cache_file': "cache/feeds.json",
+        },
+        'seen_store': {
+            'enabled': False,
+            'db_file': "cache/seen_articles.db",
+            'mode': "skip",
+            'retention_days': 30,
+        },
+        'near_duplicates': {
+            'enabled': False,
+            'max_hamming_distance': 6,
+            'shingle_size': 2,
+        },
         'similarity_threshold': 0.5,
         'preprocessing': {
             'remove_html': True,
@@ -39,6 +59,13 @@ def ensure_default_config(config_data):
             'stop_words': 'italian',
             'additional_stopwords': [],
             'min_word_length': 2,
+            'workers': 1,
+            'chunk_size': 200,
+        },
+        'language_detection': {
+            'cache_file': "cache/languages.db",
+            'short_text_chars': 60,
+            'languages': ['en', 'it', 'es', 'fr', 'de', 'pt', 'nl'],
         },
         'vectorization': {
             'method': 'tfidf',
@@ -47,6 +74,17 @@ def ensure_default_config(config_data):
             'min_df': 0.01,
             'max_features': 5000,
         },
+        'similarity_graph': {
+            'top_k': None,
+            'chunk_size': 1024,
+        },
+        'incremental_clustering': {
+            'enabled': False,
+            'state_file': "cache/stories.json",
+            'match_threshold': 0.5,
+            'max_age_days': 3,
+            'top_terms': 100,
+        },
         'similarity_options': {
             'method': 'dbscan',
             'eps': 0.5,
@@ -66,7 +104,43 @@ def ensure_default_config(config_data):
             'ollama_model': "phi3",
             'anthropic_api_key': "your_anthropic_api_key",
             'anthropic_api_url': "https://api.anthropic.com/v1/messages",
-            'anthropic_model': "claude-3-haiku-20240307"
+            'anthropic_model': "claude-3-haiku-20240307",
+            'provider_chain': [],
+            'rate_limits': {
+                'groq': {'requests_per_minute': 30, 'tokens_per_minute': 6000},
+                'gemini': {'requests_per_minute': 10, 'tokens_per_minute': 250000},
+            }
+        },
+        'llm_processing': {
+            'max_in_flight': DEFAULT_MAX_IN_FLIGHT,
+            'tokenizer': "cl100k_base",
+            'tokenizer_cache_dir': "cache/tiktoken",
+            'streaming': False,
+            'stream_deadline': 300,
+            'circuit_breaker': {
+                'failure_threshold': 3,
+                'latency_threshold': None,
+            },
+            'batching': {
+                'enabled': False,
+                'max_groups': 5,
+                'max_tokens': 6000,
+                'max_group_tokens': 800,
+            },
+            'batch_jobs': {
+                'backend': "local",
+                'directory': "cache/batch_jobs",
+                'state_file': "cache/batch_jobs.json",
+                'completion_window': "24h",
+            },
+            'skip_unchanged': True,
+            'manifest_file': "cache/rewrite_manifest.json",
+        },
+        'llm_cache': {
+            'enabled': True,
+            'path': "cache/llm_responses.db",
+            'ttl_days': 7,
+            'max_size_mb': 100,
         },
         'folders': {
             'output_folder': "output",
@@ -83,6 +157,9 @@ def ensure_default_config(config_data):
         'author': "UglyFeed",
         'category': "Technology",
         'copyright': "UglyFeed",
+        'feed_formats': ['rss', 'atom', 'json'],
+        'feed_compression': ['gz'],
+        'feed_shards': [],
         'moderation': {
             'enabled': False,
             'words_file': 'moderation/IT.txt',
@@ -1,5 +1,8 @@
 """
 This script uploads XML files to GitHub and GitLab repositories.
+
+Every feed output is deployed: the main feed and its shards, in each
+format, with their precompressed siblings.
 """
 
 import os
@@ -7,6 +10,7 @@ import base64
 import logging
 import requests
 import yaml
+from utils import UGLYFEEDS_DIR, list_feed_outputs
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -56,7 +60,7 @@ def upload_to_github(file_path, config):
         # File exists, retrieve its SHA
         sha = response.json()['sha']
         data = {
-            'message': 'Update uglyfeed.xml',
+            'message': f'Update {file_name}',
             'content': content,
             'sha': sha,
             'branch': 'main'
@@ -66,7 +70,7 @@ def upload_to_github(file_path, config):
     elif response.status_code == 404:
         # File does not exist, create it
         data = {
-            'message': 'Add uglyfeed.xml',
+            'message': f'Add {file_name}',
             'content': content,
             'branch': 'main'
         }
@@ -98,13 +102,15 @@ def upload_to_gitlab(file_path, config):
     file_name = os.path.basename(file_path)
     url = f'https://gitlab.com/api/v4/projects/{repo_name}/repository/files/{file_name}'
 
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
+    # Compressed siblings are binary, so every file is sent base64 encoded
+    with open(file_path, 'rb') as file:
+        content = base64.b64encode(file.read()).decode('utf-8')
 
     data = {
         'branch': 'main',
         'content': content,
-        'commit_message': 'Add uglyfeed.xml'
+        'encoding': 'base64',
+        'commit_message': f'Add {file_name}'
     }
 
     response = requests.post(url, json=data, headers=headers, timeout=10)
@@ -147,20 +153,29 @@ def deploy_xml(file_path, config):
 
     return urls
 
+def deploy_feeds(config, directory=UGLYFEEDS_DIR):
+    """
+    Deploy every feed output in a directory and return the URLs of each file.
+    """
+    deployed = {}
+    for file_path in list_feed_outputs(directory):
+        urls = deploy_xml(str(file_path), config)
+        if urls:
+            deployed[file_path.name] = urls
+    return deployed
+
 if __name__ == '__main__':
     # Load configuration
     config = load_config()
 
-    # File to deploy
-    XML_FILE_PATH = 'uglyfeeds/uglyfeed.xml'
-
-    # Deploy the XML file
-    urls = deploy_xml(XML_FILE_PATH, config)
+    # Deploy the main feed and its shards in every format
+    deployed = deploy_feeds(config)
 
     # Print the URLs
-    if urls:
-        logging.info("File deployed to the following URLs:")
-        for platform, url in urls.items():
-            print(f"{platform.capitalize()}: {url}")
+    if deployed:
+        logging.info("Files deployed to the following URLs:")
+        for file_name, urls in deployed.items():
+            for platform, url in urls.items():
+                print(f"{file_name} ({platform.capitalize()}): {url}")
     else:
         logging.info("No deployments were made.")
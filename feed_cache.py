@@ -0,0 +1,110 @@
+"""
+Persistent HTTP validator cache for feed downloads.
+
+Stores the ETag / Last-Modified validators returned by each feed together with
+the articles parsed from it, so unchanged feeds can be answered with a
+conditional GET (304 Not Modified) and reuse the previously parsed entries.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+
+class FeedCache:
+    """Thread-safe, JSON-backed store of per-URL validators and parsed articles."""
+
+    def __init__(self, cache_path: str):
+        self.cache_path = Path(cache_path)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.load()
+
+    def load(self) -> None:
+        """Load cached entries from disk, starting empty if the file is missing or corrupt."""
+        if not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as file:
+                self._entries = json.load(file)
+            logger.info("Loaded feed cache with %d entries from %s", len(self._entries), self.cache_path)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning("Ignoring unreadable feed cache %s: %s", self.cache_path, e)
+            self._entries = {}
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Return the If-None-Match / If-Modified-Since headers for a URL."""
+        with self._lock:
+            entry = self._entries.get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def get_articles(self, url: str) -> Optional[List[Dict[str, str]]]:
+        """Return the articles parsed the last time the feed changed."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            entry['checked_at'] = time.time()
+            self._dirty = True
+            return list(entry.get('articles', []))
+
+    def update(self, url: str, headers: Dict[str, str], articles: List[Dict[str, str]]) -> None:
+        """Store validators and parsed articles for a freshly downloaded feed."""
+        etag = headers.get('etag')
+        last_modified = headers.get('last-modified')
+        with self._lock:
+            if not etag and not last_modified:
+                # Without validators the server can never answer 304, so don't keep the entry
+                if self._entries.pop(url, None) is not None:
+                    self._dirty = True
+                return
+            now = time.time()
+            self._entries[url] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'articles': articles,
+                'fetched_at': now,
+                'checked_at': now
+            }
+            self._dirty = True
+
+    def prune(self, urls: List[str]) -> None:
+        """Drop entries for feeds that are no longer listed."""
+        keep = set(urls)
+        with self._lock:
+            stale = [url for url in self._entries if url not in keep]
+            for url in stale:
+                del self._entries[url]
+            if stale:
+                self._dirty = True
+                logger.info("Removed %d stale entries from feed cache", len(stale))
+
+    def save(self) -> None:
+        """Atomically write the cache to disk if anything changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_name(self.cache_path.name + '.tmp')
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as file:
+                    json.dump(self._entries, file, ensure_ascii=False)
+                os.replace(tmp_path, self.cache_path)
+                self._dirty = False
+            except OSError as e:
+                logger.error("Error saving feed cache to %s: %s", self.cache_path, e)
@@ -455,7 +455,7 @@ if selected == "Deploy":
     config = load_config_safe()
 
     if config is not None:
-        st.write("This section allows you to deploy the `uglyfeed.xml` file to GitHub and GitLab.")
+        st.write("This section allows you to deploy the `uglyfeed.xml` file and its feed shards to GitHub and GitLab.")
 
         # Hidden configuration
         if 'config_visible' not in st.session_state:
@@ -469,14 +469,15 @@ if selected == "Deploy":
 
         if st.button("Deploy to GitHub and GitLab"):
             try:
-                from deploy_xml import deploy_xml
+                from deploy_xml import deploy_feeds
                 with st.spinner("Deploying..."):
-                    urls = deploy_xml('uglyfeeds/uglyfeed.xml', config)
+                    urls = deploy_feeds(config)
                     if urls:
                         st.success("Deployment successful!")
-                        st.write("File deployed to the following URLs:")
-                        for platform, url in urls.items():
-                            st.markdown(f"**{platform.capitalize()}**: [View]({url})")
+                        st.write("Files deployed to the following URLs:")
+                        for file_name, file_urls in urls.items():
+                            for platform, url in file_urls.items():
+                                st.markdown(f"**{file_name}** ({platform.capitalize()}): [View]({url})")
 
                         st.session_state['urls'] = urls
                     else:
@@ -487,8 +488,9 @@ if selected == "Deploy":
         st.subheader("Previous Deployment Status")
         if 'urls' in st.session_state:
             st.write("Last deployed to the following URLs:")
-            for platform, url in st.session_state['urls'].items():
-                st.markdown(f"**{platform.capitalize()}**: [View]({url})")
+            for file_name, file_urls in st.session_state['urls'].items():
+                for platform, url in file_urls.items():
+                    st.markdown(f"**{file_name}** ({platform.capitalize()}): [View]({url})")
         else:
             st.info("No previous deployments found.")
     else:
@@ -1,17 +1,48 @@
 """
 This script processes JSON files and generates an RSS feed.
+
+Each rewritten item is turned once into a feed item model (GUID, title,
+HTML content, publication date, source links) that is rendered in the same
+pass to every configured format: RSS 2.0 (uglyfeed.xml), Atom 1.0
+(uglyfeed.atom) and JSON Feed 1.1 (uglyfeed.json). Each output also gets
+precompressed .gz and .br siblings for static hosting.
+
+Besides uglyfeed.xml, feed_shards defines smaller feeds (e.g. one category
+or language) that are filled in the same pass: items are routed into them by
+their categories, detected language or source domains, and each shard has
+its own max_items and max_age_days.
+
+The feeds are updated incrementally: a sidecar index next to the XML file
+records every item's GUID, sort key and byte range in each output, plus the
+rewritten JSON files already ingested. Each run only reads new or changed
+JSON files, copies the existing items from the outputs without parsing them
+and merges the new ones by GUID. The outputs are streamed to temp files and
+atomically renamed over the old ones, so memory stays flat however many
+items they hold and readers never see a half-written file.
 """
 
+import gzip
 import json
 import os
+import shutil
 import urllib.parse
+from urllib.parse import urlparse
 from datetime import datetime, timedelta
-from xml.etree.ElementTree import Element, SubElement, ElementTree, parse, register_namespace
+from xml.etree.ElementTree import Element, SubElement, parse, register_namespace
+from xml.sax.saxutils import XMLGenerator
 import re
 import logging
 import argparse
 import yaml
 
+from language_detection import detect_language
+from moderation_engine import get_moderation_engine
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -23,6 +54,23 @@ namespaces = {
 for prefix, uri in namespaces.items():
     register_namespace(prefix, uri)
 
+# Sidecar index stored next to the feed file
+FEED_INDEX_SUFFIX = '.index.json'
+
+# Output formats and the extension of their file next to uglyfeed.xml
+FEED_FORMATS = ['rss', 'atom', 'json']
+FEED_EXTENSIONS = {'rss': '.xml', 'atom': '.atom', 'json': '.json'}
+
+# Precompressed siblings that can be written next to every output; .br needs
+# the optional brotli package, so only .gz is written by default
+FEED_COMPRESSIONS = ['gz', 'br']
+DEFAULT_FEED_COMPRESSIONS = ['gz']
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Item attributes feed shards can be routed by
+SHARD_KEYS = ('category', 'language', 'domain')
+SHARD_NAME_PATTERN = re.compile(r'^[\w.-]+$')
+
 def load_config(config_file='config.yaml'):
     """Load configuration from a YAML file."""
     try:
@@ -44,34 +92,151 @@ def escape_xml_chars(text):
     """Escape special characters for XML content."""
     return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
 
-def read_json_files(directory):
-    """Read and load JSON files from the specified directory."""
-    json_data = []
+def read_json_files(directory, ingested=None):
+    """Read and load JSON files from the specified directory.
+
+    If ingested (file name -> mtime of files already merged into the feed) is
+    given, unchanged files are skipped and the mapping is updated in place.
+    """
+    return [data for data, _ in read_json_files_for_feeds(directory, [ingested if ingested is not None else {}])]
+
+def read_json_files_for_feeds(directory, ingested_maps):
+    """Read each new or changed JSON file once on behalf of several feeds.
+
+    ingested_maps holds the ingested mapping (file name -> mtime) of each feed;
+    a file is read if any feed has not ingested its current version, and the
+    mappings are updated in place. Returns (data, positions of the feeds that
+    need it) pairs.
+    """
+    entries = []
+    present = set()
     for filename in os.listdir(directory):
         if filename.endswith('_rewritten.json'):
             filepath = os.path.join(directory, filename)
+            present.add(filename)
+            mtime = os.path.getmtime(filepath)
+            needed_by = {position for position, ingested in enumerate(ingested_maps)
+                         if ingested.get(filename) != mtime}
+            if not needed_by:
+                continue
             try:
                 with open(filepath, 'r', encoding='utf-8') as file:
                     data = json.load(file)
-                    json_data.append(data)
+                # Rewrites cut off by the streaming deadline are never published
+                if data.get('partial'):
+                    logging.warning("Skipping partial rewrite %s", filename)
+                else:
+                    entries.append((data, needed_by))
+                for position in needed_by:
+                    ingested_maps[position][filename] = mtime
             except json.JSONDecodeError as e:
                 logging.error("Error decoding JSON from file %s: %s", filename, e)
-    return json_data
-
-def load_moderated_words(file_path):
-    """Load a list of moderated words from a file."""
+    for ingested in ingested_maps:
+        for filename in set(ingested) - present:
+            del ingested[filename]
+    return entries
+
+def item_routing_values(item, key):
+    """Return the lowercased values of a routing key for a rewritten item.
+
+    The language is detected from the rewritten text unless the item has one.
+    """
+    if key == 'category':
+        return {str(category).strip().lower() for category in item.get('categories', [])}
+    if key == 'language':
+        if not item.get('language'):
+            item['language'] = detect_language(f"{item.get('title', '')} {item.get('content', '')}")
+        return {item['language'].lower()}
+    domains = set()
+    for link in item.get('links', []):
+        domain = urlparse(link).netloc.lower().split(':')[0]
+        domains.add(domain[4:] if domain.startswith('www.') else domain)
+    return domains - {''}
+
+def shard_matches(item, match):
+    """Return True if an item has one of the wanted values for every key of a shard.
+
+    Domains also match their subdomains.
+    """
+    for key, wanted in match.items():
+        wanted = {str(value).strip().lower() for value in (wanted if isinstance(wanted, list) else [wanted])}
+        values = item_routing_values(item, key)
+        if key == 'domain':
+            matched = any(value == domain or value.endswith('.' + domain) for value in values for domain in wanted)
+        else:
+            matched = bool(values & wanted)
+        if not matched:
+            return False
+    return True
+
+def get_feed_shards(config):
+    """Return (name, match, config) for each valid shard in feed_shards.
+
+    A shard's config is the top-level config overridden by the shard's own
+    settings; its self link points at <name>.xml next to the main feed's.
+    """
+    shards = []
+    names = set()
+    for shard in config.get('feed_shards') or []:
+        name = str(shard.get('name', ''))
+        match = shard.get('match') or {}
+        if not SHARD_NAME_PATTERN.match(name) or name in names or name == 'uglyfeed':
+            logging.error("Skipping feed shard with missing, invalid or duplicate name: %r", name)
+            continue
+        if not isinstance(match, dict) or not match or set(match) - set(SHARD_KEYS):
+            logging.error("Skipping feed shard %s: match needs one or more of %s", name, ', '.join(SHARD_KEYS))
+            continue
+        names.add(name)
+
+        shard_config = dict(config)
+        shard_config.update({key: value for key, value in shard.items() if key not in ('name', 'match')})
+        if 'feed_self_link' not in shard:
+            self_link = get_config_value(config, 'feed_self_link',
+                'https://raw.githubusercontent.com/fabriziosalmi/UglyFeed/main/examples/uglyfeed-source-1.xml')
+            shard_config['feed_self_link'] = f"{self_link.rsplit('/', 1)[0]}/{name}.xml"
+        shards.append((name, match, shard_config))
+    return shards
+
+def feed_output_paths(output_path, formats):
+    """Return the output file of each format, derived from the RSS output path."""
+    base_path = os.path.splitext(output_path)[0]
+    return {feed_format: base_path + FEED_EXTENSIONS[feed_format] for feed_format in formats}
+
+def get_feed_formats(config):
+    """Return the configured output formats, RSS first."""
+    formats = [feed_format for feed_format in FEED_FORMATS if feed_format in config.get('feed_formats', FEED_FORMATS)]
+    unknown = set(config.get('feed_formats', [])) - set(FEED_FORMATS)
+    if unknown:
+        logging.warning("Ignoring unknown feed formats: %s", ', '.join(sorted(unknown)))
+    return formats or ['rss']
+
+def load_feed_index(output_path, formats=('rss',)):
+    """Load the sidecar index of a feed, or an empty one if it is missing or does not match the outputs."""
+    empty_index = {'sizes': {}, 'items': [], 'ingested': {}}
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return [line.strip() for line in file if line.strip()]
-    except FileNotFoundError:
-        logging.error("Moderated words file '%s' not found.", file_path)
-        return []
-
-def replace_swear_words(text, moderated_words):
-    """Replace swear words in the text with asterisks."""
-    for word in moderated_words:
-        text = re.sub(r'\b' + re.escape(word) + r'\b', '*' * len(word), text, flags=re.IGNORECASE)
-    return text
+        with open(output_path + FEED_INDEX_SUFFIX, 'r', encoding='utf-8') as file:
+            index = json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return empty_index
+    sizes = index.get('sizes', {})
+    paths = feed_output_paths(output_path, formats)
+    if set(sizes) != set(paths) or any(
+            not os.path.exists(path) or os.path.getsize(path) != sizes[feed_format]
+            for feed_format, path in paths.items()):
+        logging.info("Feed index for %s is stale, rebuilding it", output_path)
+        return empty_index
+    return index
+
+def save_feed_index(output_path, index):
+    """Atomically write the sidecar index of a feed."""
+    index_path = output_path + FEED_INDEX_SUFFIX
+    tmp_path = index_path + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(index, file)
+        os.replace(tmp_path, index_path)
+    except OSError as e:
+        logging.error("Error saving feed index %s: %s", index_path, e)
 
 def create_rss_channel(config):
     """Create the base RSS channel element with proper namespaces and configuration."""
@@ -113,28 +278,40 @@ def create_rss_channel(config):
 
     return rss, channel
 
-def process_item(item, config, moderated_words):
-    """Process individual JSON item to XML item element."""
-    item_element = Element('item')
+def parse_processed_at(item):
+    """Return when an item was processed, defaulting to now."""
+    processed_at_str = item.get('processed_at') or datetime.now().isoformat()
+    try:
+        return datetime.strptime(processed_at_str, '%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        return datetime.now()
+
+def get_cutoff_date(config):
+    """Return the date before which items are dropped from a feed."""
+    return datetime.now() - timedelta(days=int(get_config_value(config, 'max_age_days', 30)))
+
+def build_feed_item(item, config, moderation=None):
+    """Build the format-independent feed item model of a rewritten JSON item.
 
+    The model holds the plain (moderated) title, the HTML content with the
+    source list and generator note, the publication date and source links.
+    moderation is the ModerationEngine used when moderation is enabled.
+    """
     moderation_config = config.get('moderation', {})
     moderation_enabled = moderation_config.get('enabled', False)
     allow_duplicates = moderation_config.get('allow_duplicates', True)
 
-    item_title = SubElement(item_element, 'title')
-    title_text = item.get('title', 'No Title')
-    item_title.text = escape_xml_chars(
-        replace_swear_words(title_text, moderated_words) if moderation_enabled else title_text
-    )
+    title = item.get('title', 'No Title')
+    if moderation_enabled and moderation:
+        title = moderation.censor(title)
 
-    item_description = SubElement(item_element, 'description')
     content = item.get('content', 'No Content')
     content = escape_xml_chars(
-        replace_swear_words(content, moderated_words) if moderation_enabled else content
+        moderation.censor(content) if moderation_enabled and moderation else content
     )
 
+    links = item.get('links', [])
     if 'links' in item:
-        links = item['links']
         if not allow_duplicates:
             links = list(dict.fromkeys(item['links']))  # Remove duplicate links
 
@@ -150,86 +327,352 @@ def process_item(item, config, moderated_words):
         f'<b>{escape_xml_chars(api.capitalize())}</b></small>'
     )
 
-    item_description.text = content
+    return {
+        'guid': f"https://github.com/fabriziosalmi/UglyFeed/{urllib.parse.quote(item.get('story_id') or item.get('title', 'No Title'))}",
+        'title': title,
+        'content_html': content,
+        'published': parse_processed_at(item),
+        'links': links,
+    }
 
-    processed_at_str = item.get('processed_at', datetime.now().isoformat())
-    if processed_at_str is None:
-        processed_at_str = datetime.now().isoformat()
-    try:
-        processed_at = datetime.strptime(processed_at_str, '%Y-%m-%d %H:%M:%S')
-    except ValueError:
-        processed_at = datetime.now()
+def rss_item_element(feed_item, config):
+    """Render a feed item model as an RSS item element."""
+    item_element = Element('item')
+
+    item_title = SubElement(item_element, 'title')
+    item_title.text = escape_xml_chars(feed_item['title'])
+
+    item_description = SubElement(item_element, 'description')
+    item_description.text = feed_item['content_html']
 
     pub_date = SubElement(item_element, 'pubDate')
-    pub_date.text = processed_at.strftime(
+    pub_date.text = feed_item['published'].strftime(
         get_config_value(config, 'datetime_format', '%a, %d %b %Y %H:%M:%S GMT')
     )
 
     guid = SubElement(item_element, 'guid')
-    guid.text = f"https://github.com/fabriziosalmi/UglyFeed/{urllib.parse.quote(item.get('title', 'No Title'))}"
+    guid.text = feed_item['guid']
 
     return item_element
 
-def create_rss_feed(json_data, output_path, config):
-    """Create or update an RSS feed based on provided JSON data."""
+def process_item(item, config, moderation=None):
+    """Process individual JSON item to XML item element.
+
+    moderation is the ModerationEngine used when moderation is enabled.
+    """
+    return rss_item_element(build_feed_item(item, config, moderation), config)
+
+def read_indexed_items(output_path, index, config):
+    """Return (guid, sort key, byte ranges, feed item) for the items of the existing feeds.
+
+    With a valid index each item comes with its (offset, length) byte range in
+    every output, so nothing is loaded; otherwise the RSS file is parsed once
+    and each item is turned back into a feed item model to render again.
+    """
+    if index['items']:
+        return [(entry['guid'], entry['sort_key'], entry['ranges'], None) for entry in index['items']]
+    if not os.path.exists(output_path):
+        return []
+
+    channel = parse(output_path).getroot().find('channel')
+    if channel is None:
+        raise ValueError("Channel element not found in existing RSS file.")
+    datetime_format = get_config_value(config, 'datetime_format', '%a, %d %b %Y %H:%M:%S GMT')
+    items = []
+    for item_element in channel.findall('item'):
+        guid = item_element.findtext('guid') or item_element.findtext('title') or ''
+        try:
+            published = datetime.strptime(item_element.findtext('pubDate') or '', datetime_format)
+            sort_key = published.timestamp()
+        except ValueError:
+            published, sort_key = datetime.fromtimestamp(0), 0.0
+        title = (item_element.findtext('title') or '').replace('&lt;', '<').replace('&gt;', '>').replace('&amp;', '&')
+        feed_item = {'guid': guid, 'title': title, 'content_html': item_element.findtext('description') or '',
+                     'published': published, 'links': []}
+        items.append((guid, sort_key, None, feed_item))
+    return items
+
+def write_element(generator, element):
+    """Serialize an element and its children through an XMLGenerator."""
+    generator.startElement(element.tag, dict(element.attrib))
+    if element.text:
+        generator.characters(element.text)
+    for child in element:
+        write_element(generator, child)
+        if child.tail:
+            generator.characters(child.tail)
+    generator.endElement(element.tag)
+
+def format_self_link(config, feed_format):
+    """Return the public URL of an output, derived from feed_self_link."""
+    self_link = get_config_value(config, 'feed_self_link',
+        'https://raw.githubusercontent.com/fabriziosalmi/UglyFeed/main/examples/uglyfeed-source-1.xml')
+    return os.path.splitext(self_link)[0] + FEED_EXTENSIONS[feed_format]
+
+def format_timestamp(moment):
+    """Format a publication date as RFC 3339, treating it as UTC like the RSS pubDate."""
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+class FeedWriter:
+    """Streams one output format: a header, the items and a footer.
+
+    Byte ranges recorded for the items exclude item_separator, so existing
+    items can be copied between runs as they are.
+    """
+
+    item_separator = b''
+
+    def __init__(self, out, config):
+        self.out = out
+        self.config = config
+
+    def write_header(self, updated):
+        """Write everything before the first item; updated is the date of the newest item."""
+        raise NotImplementedError
+
+    def write_item(self, feed_item):
+        """Render a feed item model."""
+        raise NotImplementedError
+
+    def write_footer(self):
+        """Write everything after the last item."""
+        raise NotImplementedError
+
+class RSSFeedWriter(FeedWriter):
+    """RSS 2.0 writer."""
+
+    def __init__(self, out, config):
+        super().__init__(out, config)
+        # The generator writes through to the file, so out.tell() is the current byte offset
+        self.generator = XMLGenerator(out, encoding='utf-8')
+        self.rss, self.channel = create_rss_channel(config)
+
+    def write_header(self, updated):
+        self.generator.startDocument()
+        self.generator.startElement(self.rss.tag, dict(self.rss.attrib))
+        self.generator.startElement(self.channel.tag, {})
+        for child in self.channel:
+            write_element(self.generator, child)
+
+    def write_item(self, feed_item):
+        write_element(self.generator, rss_item_element(feed_item, self.config))
+
+    def write_footer(self):
+        self.generator.endElement(self.channel.tag)
+        self.generator.endElement(self.rss.tag)
+        self.generator.endDocument()
+
+class AtomFeedWriter(FeedWriter):
+    """Atom 1.0 writer."""
+
+    def __init__(self, out, config):
+        super().__init__(out, config)
+        self.generator = XMLGenerator(out, encoding='utf-8')
+
+    def write_text_element(self, tag, text, attributes=None):
+        self.generator.startElement(tag, attributes or {})
+        self.generator.characters(text)
+        self.generator.endElement(tag)
+
+    def write_header(self, updated):
+        config = self.config
+        feed_link = get_config_value(config, 'feed_link', 'https://github.com/fabriziosalmi/UglyFeed')
+        self.generator.startDocument()
+        self.generator.startElement('feed', {'xmlns': namespaces['atom'],
+                                             'xml:lang': get_config_value(config, 'feed_language', 'en')})
+        self.write_text_element('title', get_config_value(config, 'feed_title', 'UglyFeed News Feed'))
+        self.write_text_element('subtitle', get_config_value(config, 'feed_description', 'Generated by UglyFeed'))
+        self.write_text_element('link', '', {'href': feed_link, 'rel': 'alternate'})
+        self.write_text_element('link', '', {'href': format_self_link(config, 'atom'), 'rel': 'self',
+                                             'type': 'application/atom+xml'})
+        self.write_text_element('id', feed_link)
+        self.write_text_element('updated', format_timestamp(updated))
+        if 'author' in config:
+            self.generator.startElement('author', {})
+            self.write_text_element('name', get_config_value(config, 'author'))
+            self.generator.endElement('author')
+        if 'category' in config:
+            self.write_text_element('category', '', {'term': get_config_value(config, 'category')})
+        if 'copyright' in config:
+            self.write_text_element('rights', get_config_value(config, 'copyright'))
+
+    def write_item(self, feed_item):
+        self.generator.startElement('entry', {})
+        self.write_text_element('title', feed_item['title'])
+        self.write_text_element('id', feed_item['guid'])
+        if feed_item['links']:
+            self.write_text_element('link', '', {'href': feed_item['links'][0], 'rel': 'alternate'})
+        self.write_text_element('published', format_timestamp(feed_item['published']))
+        self.write_text_element('updated', format_timestamp(feed_item['published']))
+        self.write_text_element('content', feed_item['content_html'], {'type': 'html'})
+        self.generator.endElement('entry')
+
+    def write_footer(self):
+        self.generator.endElement('feed')
+        self.generator.endDocument()
+
+class JSONFeedWriter(FeedWriter):
+    """JSON Feed 1.1 writer, one item per line."""
+
+    item_separator = b',\n'
+
+    def write_header(self, updated):
+        config = self.config
+        header = {
+            'version': 'https://jsonfeed.org/version/1.1',
+            'title': get_config_value(config, 'feed_title', 'UglyFeed News Feed'),
+            'home_page_url': get_config_value(config, 'feed_link', 'https://github.com/fabriziosalmi/UglyFeed'),
+            'feed_url': format_self_link(config, 'json'),
+            'description': get_config_value(config, 'feed_description', 'Generated by UglyFeed'),
+            'language': get_config_value(config, 'feed_language', 'en'),
+        }
+        if 'author' in config:
+            header['authors'] = [{'name': get_config_value(config, 'author')}]
+        # Leave the object open and start the items array
+        self.out.write(json.dumps(header, ensure_ascii=False)[:-1].encode('utf-8') + b', "items": [\n')
+
+    def write_item(self, feed_item):
+        item = {
+            'id': feed_item['guid'],
+            'title': feed_item['title'],
+            'content_html': feed_item['content_html'],
+            'date_published': format_timestamp(feed_item['published']),
+        }
+        if feed_item['links']:
+            item['external_url'] = feed_item['links'][0]
+        self.out.write(json.dumps(item, ensure_ascii=False).encode('utf-8'))
+
+    def write_footer(self):
+        self.out.write(b'\n]}\n')
+
+FEED_WRITERS = {'rss': RSSFeedWriter, 'atom': AtomFeedWriter, 'json': JSONFeedWriter}
+
+def write_compressed_siblings(path, compressions):
+    """Write precompressed .gz/.br copies of an output next to it and drop stale ones."""
+    for compression in FEED_COMPRESSIONS:
+        sibling_path = f"{path}.{compression}"
+        if compression not in compressions or (compression == 'br' and brotli is None):
+            if compression in compressions:
+                logging.warning("brotli is not installed, skipping %s", sibling_path)
+            if os.path.exists(sibling_path):
+                os.remove(sibling_path)
+            continue
+
+        tmp_path = sibling_path + '.tmp'
+        with open(path, 'rb') as source, open(tmp_path, 'wb') as out:
+            if compression == 'gz':
+                with gzip.GzipFile(fileobj=out, mode='wb', compresslevel=9, mtime=0) as compressed:
+                    shutil.copyfileobj(source, compressed, COPY_CHUNK_SIZE)
+            else:
+                compressor = brotli.Compressor(quality=11)
+                for chunk in iter(lambda: source.read(COPY_CHUNK_SIZE), b''):
+                    out.write(compressor.process(chunk))
+                out.write(compressor.finish())
+        os.replace(tmp_path, sibling_path)
+
+def write_feeds(output_path, config, items, formats):
+    """Stream all outputs to temp files in one pass over the items, then atomically replace them.
+
+    items are (guid, (sort key, byte ranges, feed item)) pairs: an item with a
+    feed item model is rendered, otherwise its byte range in each current
+    output is copied over as is. Returns the index entries of the written
+    items and the size of each new output.
+    """
+    paths = feed_output_paths(output_path, formats)
+    updated = datetime.fromtimestamp(items[0][1][0]) if items else datetime.now()
+    outputs, writers, existing_outputs = {}, {}, {}
+    index_items = []
+    try:
+        for feed_format, path in paths.items():
+            outputs[feed_format] = open(path + '.tmp', 'wb')  # pylint: disable=consider-using-with
+            writers[feed_format] = FEED_WRITERS[feed_format](outputs[feed_format], config)
+            writers[feed_format].write_header(updated)
+
+        for position, (guid, (sort_key, ranges, feed_item)) in enumerate(items):
+            item_ranges = {}
+            for feed_format, writer in writers.items():
+                out = outputs[feed_format]
+                if position:
+                    out.write(writer.item_separator)
+                offset = out.tell()
+                if feed_item is not None:
+                    writer.write_item(feed_item)
+                else:
+                    if feed_format not in existing_outputs:
+                        existing_outputs[feed_format] = open(paths[feed_format], 'rb')  # pylint: disable=consider-using-with
+                    existing_outputs[feed_format].seek(ranges[feed_format][0])
+                    out.write(existing_outputs[feed_format].read(ranges[feed_format][1]))
+                item_ranges[feed_format] = [offset, out.tell() - offset]
+            index_items.append({'guid': guid, 'sort_key': sort_key, 'ranges': item_ranges})
+
+        sizes = {}
+        for feed_format, writer in writers.items():
+            writer.write_footer()
+            sizes[feed_format] = outputs[feed_format].tell()
+            outputs[feed_format].close()
+    except OSError:
+        for feed_format, out in outputs.items():
+            out.close()
+            if os.path.exists(paths[feed_format] + '.tmp'):
+                os.remove(paths[feed_format] + '.tmp')
+        raise
+    finally:
+        for existing_output in existing_outputs.values():
+            existing_output.close()
+
+    for path in paths.values():
+        os.replace(path + '.tmp', path)
+    return index_items, sizes
+
+def create_rss_feed(json_data, output_path, config, index=None):
+    """Create or update the feeds based on provided JSON data.
+
+    New items replace existing items with the same GUID; the feeds keep the
+    newest max_items items not older than max_age_days. Each output is streamed to a temp file that
+    replaces the old one only once complete, its compressed siblings are
+    refreshed and the sidecar index is updated alongside.
+    """
+    formats = get_feed_formats(config)
+    if index is None:
+        index = load_feed_index(output_path, formats)
+
     moderation_config = config.get('moderation', {})
     moderation_enabled = moderation_config.get('enabled', False)
     moderated_words_file = moderation_config.get('words_file', 'moderated.txt')
-    moderated_words = load_moderated_words(moderated_words_file) if moderation_enabled else []
+    moderation = get_moderation_engine(moderated_words_file) if moderation_enabled else None
 
-    if os.path.exists(output_path):
-        try:
-            tree = parse(output_path)
-            rss = tree.getroot()
-            channel = rss.find('channel')
-            if channel is None:
-                raise ValueError("Channel element not found in existing RSS file.")
-        except (ValueError, Exception) as e:
-            logging.error("Error parsing existing RSS file: %s", e)
-            return
-    else:
-        rss, channel = create_rss_channel(config)
-
-    new_items = []
-    cutoff_date = datetime.now() - timedelta(days=int(get_config_value(config, 'max_age_days', 30)))
+    try:
+        existing_items = read_indexed_items(output_path, index, config)
+    except Exception as e:  # pylint: disable=broad-except
+        logging.error("Error parsing existing RSS file: %s", e)
+        return
+
+    cutoff_date = get_cutoff_date(config)
+    # Items already in the feed age out like new ones
+    merged_items = {
+        guid: (sort_key, ranges, feed_item)
+        for guid, sort_key, ranges, feed_item in existing_items
+        if sort_key >= cutoff_date.timestamp()
+    }
     for item in json_data:
-        item_element = process_item(item, config, moderated_words)
-        pub_date_element = item_element.find('pubDate')
-        if pub_date_element is not None:
-            processed_at = datetime.strptime(
-                pub_date_element.text,
-                get_config_value(config, 'datetime_format', '%a, %d %b %Y %H:%M:%S GMT')
-            )
-        else:
-            processed_at = datetime.now()
-
-        if processed_at >= cutoff_date:
-            new_items.append(item_element)
-
-    existing_items = list(channel.findall('item')) if channel is not None else []
-    all_items = existing_items + new_items
-    all_items.sort(
-        key=lambda x: datetime.strptime(
-            x.find('pubDate').text, 
-            get_config_value(config, 'datetime_format', '%a, %d %b %Y %H:%M:%S GMT')
-        ), 
-        reverse=True
-    )
+        processed_at = parse_processed_at(item)
+        if processed_at < cutoff_date:
+            continue
+        feed_item = build_feed_item(item, config, moderation)
+        merged_items[feed_item['guid']] = (processed_at.timestamp(), None, feed_item)
 
     max_items = int(get_config_value(config, 'max_items', 50))
-    trimmed_items = all_items[:max_items]
-
-    if channel is not None:
-        for item in channel.findall('item'):
-            channel.remove(item)
-        for item in trimmed_items:
-            channel.append(item)
+    trimmed_items = sorted(merged_items.items(), key=lambda entry: entry[1][0], reverse=True)[:max_items]
 
     try:
-        tree = ElementTree(rss)
-        tree.write(output_path, encoding='utf-8', xml_declaration=True)
+        index_items, sizes = write_feeds(output_path, config, trimmed_items, formats)
+        compressions = config.get('feed_compression', DEFAULT_FEED_COMPRESSIONS)
+        for path in feed_output_paths(output_path, formats).values():
+            write_compressed_siblings(path, compressions)
+        index.update({'sizes': sizes, 'items': index_items})
+        save_feed_index(output_path, index)
         item_count = len(trimmed_items)
-        logging.info("RSS feed successfully updated at %s", output_path)
+        logging.info("Feeds (%s) successfully updated at %s", ', '.join(formats), output_path)
         logging.info("Total items in feed: %d", item_count)
         print(f"RSS feed successfully generated at {output_path}")
         print(f"Total items in feed: {item_count}")
@@ -277,16 +720,33 @@ def main():
     logging.debug("Configuration: %s", json.dumps(config, indent=4))
 
     rewritten_dir = config.get('rewritten_dir', 'rewritten')
-    output_path = os.path.join(config.get('output_dir', 'uglyfeeds'), 'uglyfeed.xml')
-
-    os.makedirs(config.get('output_dir', 'uglyfeeds'), exist_ok=True)
-
-    json_data = read_json_files(rewritten_dir)
-
-    if json_data:
-        create_rss_feed(json_data, output_path, config)
-    else:
-        logging.info('No JSON files found in the rewritten directory.')
+    output_dir = config.get('output_dir', 'uglyfeeds')
+    output_path = os.path.join(output_dir, 'uglyfeed.xml')
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    # The main feed takes every item, each shard only the items matching it
+    feeds = [(output_path, None, config)] + [
+        (os.path.join(output_dir, f"{name}.xml"), match, shard_config)
+        for name, match, shard_config in get_feed_shards(config)
+    ]
+    # Shards may override feed_formats, so each index is checked against its own outputs
+    indexes = [load_feed_index(path, get_feed_formats(feed_config)) for path, _, feed_config in feeds]
+
+    # Each file that is new or changed for any feed is read once
+    entries = read_json_files_for_feeds(rewritten_dir, [index['ingested'] for index in indexes])
+
+    for position, ((path, match, feed_config), index) in enumerate(zip(feeds, indexes)):
+        needed = [data for data, needed_by in entries if position in needed_by]
+        # Without new files a feed is still rewritten to drop its expired items
+        cutoff = get_cutoff_date(feed_config).timestamp()
+        expired = any(entry['sort_key'] < cutoff for entry in index['items'])
+        if not needed and not expired:
+            if match is None:
+                logging.info('No new JSON files found in the rewritten directory.')
+            continue
+        json_data = needed if match is None else [data for data in needed if shard_matches(data, match)]
+        create_rss_feed(json_data, path, feed_config, index)
 
 if __name__ == '__main__':
     main()
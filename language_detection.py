@@ -0,0 +1,143 @@
+"""
+Deterministic, cached language detection for UglyFeed.
+
+langdetect is seeded so repeated calls agree, short texts (where langdetect is
+unreliable and slowest per character) are first scored against stopword lists,
+and results are persisted in SQLite keyed by a hash of the text so each article
+is only detected once in its lifetime.
+"""
+
+import hashlib
+import re
+import sqlite3
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from langdetect import DetectorFactory, detect
+
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+# Make langdetect deterministic across calls and processes
+DetectorFactory.seed = 0
+
+# ISO 639-1 codes returned by langdetect mapped to NLTK stopword corpora
+STOPWORD_LANGUAGES = {
+    'en': 'english',
+    'it': 'italian',
+    'es': 'spanish',
+    'fr': 'french',
+    'de': 'german',
+    'pt': 'portuguese',
+    'nl': 'dutch',
+}
+
+# Result of failed detections; never cached so the text is retried next run
+UNKNOWN_LANGUAGE = 'unknown'
+
+MARKUP_PATTERN = re.compile(r"<[^<]+?>|https?://\S+")
+WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+
+@lru_cache(maxsize=None)
+def load_stopword_sets(languages: Tuple[str, ...]) -> Dict[str, FrozenSet[str]]:
+    """Load stopword sets for the candidate languages, skipping corpora that are not installed."""
+    try:
+        from nltk.corpus import stopwords  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return {}
+
+    sets = {}
+    for language in languages:
+        corpus = STOPWORD_LANGUAGES.get(language)
+        if not corpus:
+            continue
+        try:
+            sets[language] = frozenset(stopwords.words(corpus))
+        except LookupError:
+            logger.debug("Stopword corpus %s not available for language heuristic", corpus)
+    return sets
+
+
+def guess_short_text_language(words: List[str], languages: Tuple[str, ...]) -> Optional[str]:
+    """Return the language whose stopwords clearly dominate the words, if any."""
+    scores = sorted(
+        ((sum(word in stop_words for word in words), language)
+         for language, stop_words in load_stopword_sets(languages).items()),
+        reverse=True
+    )
+    if scores and scores[0][0] > 0 and (len(scores) == 1 or scores[0][0] > scores[1][0]):
+        return scores[0][1]
+    return None
+
+
+def detect_language(text: str, short_text_chars: int = 60,
+                    languages: Tuple[str, ...] = tuple(STOPWORD_LANGUAGES)) -> str:
+    """Detect the language of a text, using a stopword vote for short texts."""
+    words = WORD_PATTERN.findall(MARKUP_PATTERN.sub(" ", text).lower())
+    if not words:
+        return UNKNOWN_LANGUAGE
+
+    if sum(map(len, words)) < short_text_chars:
+        guess = guess_short_text_language(words, languages)
+        if guess:
+            return guess
+
+    try:
+        return detect(text)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.warning("Language detection failed: %s", e)
+        return UNKNOWN_LANGUAGE
+
+
+def text_hash(text: str) -> str:
+    """Hash a text for use as a language cache key."""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class LanguageCache:
+    """SQLite-backed cache of detected languages keyed by text hash."""
+
+    def __init__(self, db_path: str, retention_days: int = 30):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.db_path))
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS languages ("
+            "text_hash TEXT PRIMARY KEY, language TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        if retention_days:
+            cutoff = time.time() - retention_days * 86400
+            self.connection.execute("DELETE FROM languages WHERE last_used < ?", (cutoff,))
+        # Failed detections stored by earlier versions are dropped so they are retried
+        self.connection.execute("DELETE FROM languages WHERE language = ?", (UNKNOWN_LANGUAGE,))
+        self.connection.commit()
+        self._languages: Dict[str, str] = dict(
+            self.connection.execute("SELECT text_hash, language FROM languages")
+        )
+
+    def get_many(self, hashes: Iterable[str]) -> List[Optional[str]]:
+        """Return the cached language for each hash, or None when unknown."""
+        return [self._languages.get(digest) for digest in hashes]
+
+    def put_many(self, entries: Dict[str, str]) -> None:
+        """Store detected languages and refresh the last-used time of the given hashes.
+
+        Failed detections are not stored, so a transient failure is retried next run.
+        """
+        entries = {digest: language for digest, language in entries.items() if language != UNKNOWN_LANGUAGE}
+        now = time.time()
+        self.connection.executemany(
+            "INSERT INTO languages (text_hash, language, last_used) VALUES (?, ?, ?) "
+            "ON CONFLICT (text_hash) DO UPDATE SET language = excluded.language, last_used = excluded.last_used",
+            [(digest, language, now) for digest, language in entries.items()]
+        )
+        self.connection.commit()
+        self._languages.update(entries)
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self.connection.close()
@@ -0,0 +1,97 @@
+"""
+Content-addressed cache of LLM responses for UglyFeed.
+
+Responses are stored in SQLite under a hash of everything that determines the
+completion (provider, model, prompt prefix, combined group content and the
+generation parameters), so a group that did not change between runs is not
+sent to the API again. Entries expire after a TTL and the least recently used
+ones are evicted once the cache grows past its size limit.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+
+def response_key(provider: str, model: str, prefix: str, content: str, params: Dict[str, Any]) -> str:
+    """Hash the inputs that determine an LLM response."""
+    payload = json.dumps([provider, model, prefix, content, params], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed LLM response cache with TTL and size-based eviction, safe to share between threads."""
+
+    def __init__(self, db_path: str, ttl_days: float = 7, max_size_mb: float = 100):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_days * 86400 if ttl_days else None
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024) if max_size_mb else None
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.connection.commit()
+        with self.lock:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop expired entries, then the least recently used ones until the size limit is met."""
+        if self.ttl_seconds:
+            self.connection.execute("DELETE FROM responses WHERE created_at < ?",
+                                    (time.time() - self.ttl_seconds,))
+        if self.max_size_bytes:
+            total_size = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total_size > self.max_size_bytes:
+                removed = 0
+                for key, size in self.connection.execute(
+                        "SELECT key, size FROM responses ORDER BY last_used").fetchall():
+                    self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    total_size -= size
+                    removed += 1
+                    if total_size <= self.max_size_bytes:
+                        break
+                logger.info("Evicted %d LLM responses to keep the cache under %d bytes",
+                            removed, self.max_size_bytes)
+        self.connection.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None when missing or expired."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl_seconds and row[1] < time.time() - self.ttl_seconds:
+                return None
+            self.connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.connection.commit()
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        """Store a response and evict old entries if the cache grew too large."""
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response.encode('utf-8')), now, now)
+            )
+            self._evict()
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self.lock:
+            self.connection.close()
@@ -9,15 +9,26 @@ import logging
 import argparse
 import yaml
 import os
+import socket
 import sys
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from openai import OpenAI
-from typing import Optional, Dict, Any, Union, List
+from openai import OpenAI, RateLimitError
+from typing import Optional, Dict, Any, Union, List, Iterator, Tuple
+
+from batch_jobs import (BatchBackend, BatchJobStore, LocalFileBatchBackend, OpenAIBatchBackend,
+                        write_batch_file)
+from config import DEFAULT_MAX_IN_FLIGHT
+from llm_cache import ResponseCache, response_key
+from rewrite_manifest import RewriteManifest, file_hash, settings_hash
+from token_budget import (DEFAULT_CACHE_DIR, DEFAULT_ENCODING, configure_tokenizer_cache, fair_truncate,
+                          get_token_counter)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -26,12 +37,96 @@ logger = logging.getLogger(__name__)
 # Maximum context length for LLM APIs
 MAX_TOKENS = 32768
 
+# Sampling parameters sent with every completion request
+GENERATION_PARAMS = {'max_tokens': 4096, 'temperature': 0.7}
+
+SYSTEM_PROMPT = "You are a professional assistant, skilled in composing detailed and accurate news articles from multiple sources."
+
+# Seconds allowed to establish the connection of a streaming request
+STREAM_CONNECT_TIMEOUT = 10
+# Subfolder of the rewritten folder holding rewrites cut off by the streaming deadline
+PARTIAL_SUBFOLDER = "partial"
+# Stop reasons of streams that ended before the model finished its answer
+INCOMPLETE_STOP_REASONS = {'length', 'max_tokens', 'content_filter', 'safety', 'recitation'}
+
+class RateLimiter:
+    """Token-bucket limiter for requests and tokens per minute, shared by all worker threads."""
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.capacity = {'requests': requests_per_minute, 'tokens': tokens_per_minute}
+        self.level = {bucket: capacity for bucket, capacity in self.capacity.items() if capacity}
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        self.updated_at = now
+        for bucket in self.level:
+            capacity = self.capacity[bucket]
+            self.level[bucket] = min(capacity, self.level[bucket] + elapsed * capacity / 60.0)
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until one request of the given token size fits both budgets; return seconds waited."""
+        start = time.monotonic()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                # Requests bigger than the whole budget are let through once the bucket is full
+                needed = {'requests': 1, 'tokens': min(tokens, self.capacity['tokens'] or 0)}
+                wait = max(0.0, self.paused_until - now)
+                for bucket, level in self.level.items():
+                    deficit = needed[bucket] - level
+                    if deficit > 0:
+                        wait = max(wait, deficit * 60.0 / self.capacity[bucket])
+                if wait <= 0:
+                    for bucket in self.level:
+                        self.level[bucket] -= needed[bucket]
+                    return now - start
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every worker for the given time, e.g. after the server answered 429."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+_rate_limiters: Dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: Optional[str], model: str,
+                     rate_limits: Optional[Dict[str, Any]]) -> Optional[RateLimiter]:
+    """Return the shared limiter for a provider and model, if limits are configured.
+
+    Limits are looked up under "provider/model" first and then "provider".
+    """
+    if not provider or not rate_limits:
+        return None
+    key = f"{provider}/{model}"
+    limits = rate_limits.get(key) or rate_limits.get(provider)
+    if not limits:
+        return None
+    with _rate_limiters_lock:
+        if key not in _rate_limiters:
+            _rate_limiters[key] = RateLimiter(limits.get('requests_per_minute'), limits.get('tokens_per_minute'))
+        return _rate_limiters[key]
+
+
 class APIClientFactory:
     """Factory class to create appropriate API clients based on provider type."""
     
     @staticmethod
-    def create_client(provider: str, api_key: str, api_url: Optional[str] = None) -> 'BaseAPIClient':
-        """Create and return appropriate API client based on provider."""
+    def create_client(provider: str, api_key: str, api_url: Optional[str] = None,
+                      pool_size: int = 10, rate_limits: Optional[Dict[str, Any]] = None) -> 'BaseAPIClient':
+        """Create and return appropriate API client based on provider.
+
+        A client is safe to share between worker threads; pool_size should
+        match the number of requests kept in flight. rate_limits maps
+        "provider" or "provider/model" to requests_per_minute and
+        tokens_per_minute budgets.
+        """
         providers = {
             'openai': OpenAICompatibleClient,
             'azure': AzureOpenAIClient,
@@ -47,14 +142,33 @@ class APIClientFactory:
         if not client_class:
             raise ValueError(f"Unsupported provider: {provider}")
             
-        return client_class(api_key, api_url)
+        return client_class(api_key, api_url, pool_size=pool_size, provider=provider.lower(),
+                            rate_limits=rate_limits)
+
+def abort_response(response: requests.Response) -> None:
+    """Close a streaming response from another thread, waking up a read blocked on its socket."""
+    connection = getattr(response.raw, 'connection', None)
+    sock = getattr(connection, 'sock', None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    response.close()
 
 class BaseAPIClient:
     """Base class for API clients."""
     
-    def __init__(self, api_key: str, api_url: Optional[str] = None):
+    # Number of times a 429 answer is retried before giving up
+    max_rate_limit_retries = 3
+
+    def __init__(self, api_key: str, api_url: Optional[str] = None, pool_size: int = 10,
+                 provider: Optional[str] = None, rate_limits: Optional[Dict[str, Any]] = None):
         self.api_key = api_key
         self.api_url = api_url or self._get_default_api_url()
+        self.pool_size = max(1, pool_size)
+        self.provider = provider
+        self.rate_limits = rate_limits or {}
         self.session = self._create_session()
 
     def _get_default_api_url(self) -> str:
@@ -71,7 +185,7 @@ class BaseAPIClient:
             backoff_factor=0.3,
             status_forcelist=(500, 502, 504),
         )
-        adapter = HTTPAdapter(max_retries=retry)
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=self.pool_size, pool_maxsize=self.pool_size)
         session.mount('http://', adapter)
         session.mount('https://', adapter)
         return session
@@ -86,16 +200,53 @@ class BaseAPIClient:
     def format_messages(self, content: str) -> List[Dict[str, str]]:
         """Format messages for API request."""
         return [
-            {"role": "system", "content": "You are a professional assistant, skilled in composing detailed and accurate news articles from multiple sources."},
+            {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": content}
         ]
 
+    def build_payload(self, content: str, model: str, stream: bool = False) -> Dict[str, Any]:
+        """Build the request body for a completion."""
+        return {
+            "model": model,
+            "messages": self.format_messages(content),
+            **GENERATION_PARAMS,
+            "stream": stream
+        }
+
+    def get_stream_url(self, model: str) -> str:
+        """Return the URL used for streaming completions."""
+        return self.api_url
+
     def parse_response(self, response: Dict[str, Any]) -> Optional[str]:
         """Parse API response and extract content."""
         raise NotImplementedError
 
+    def iter_stream_events(self, response: requests.Response) -> Iterator[Dict[str, Any]]:
+        """Yield the JSON events of a server-sent-events stream."""
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith('data:'):
+                continue
+            data = line[len('data:'):].strip()
+            if data == '[DONE]':
+                return
+            yield json.loads(data)
+
+    def parse_stream_event(self, event: Dict[str, Any]) -> Optional[str]:
+        """Extract the text delta carried by one stream event; raise on error events."""
+        raise NotImplementedError
+
+    def stream_stop_reason(self, event: Dict[str, Any]) -> Optional[str]:
+        """Return the stop reason carried by a stream event, if any."""
+        return None
+
     def handle_rate_limit(self, response: requests.Response) -> Optional[float]:
         """Handle rate limiting and return retry delay if applicable."""
+        retry_after_header = response.headers.get('Retry-After')
+        if retry_after_header:
+            try:
+                return float(retry_after_header)
+            except ValueError:
+                pass
         if 'rate_limit_exceeded' in response.text:
             try:
                 retry_after = float(re.search(r"try again in (\d+\.?\d*)s", 
@@ -105,29 +256,42 @@ class BaseAPIClient:
                 return 60.0  # Default retry after 60 seconds
         return None
 
+    def wait_for_rate_limit(self, content: str, model: str) -> Optional[RateLimiter]:
+        """Pace the request through the provider's limiter and return the limiter used."""
+        limiter = get_rate_limiter(self.provider, model, self.rate_limits)
+        if limiter:
+            waited = limiter.acquire(estimate_token_count(content))
+            if waited >= 1:
+                logger.info(f"Rate limiter delayed request to {self.provider}/{model} by {waited:.1f} seconds")
+        return limiter
+
+    def post_with_rate_limit(self, url: str, payload: Dict[str, Any], content: str,
+                             model: str, **kwargs) -> requests.Response:
+        """POST a request, pacing it proactively and retrying 429 answers a bounded number of times.
+
+        Extra keyword arguments are passed to requests, e.g. stream and timeout.
+        """
+        for attempt in range(self.max_rate_limit_retries + 1):
+            limiter = self.wait_for_rate_limit(content, model)
+            response = self.session.post(url, headers=self.get_headers(), json=payload, **kwargs)
+            if response.status_code != 429 or attempt == self.max_rate_limit_retries:
+                return response
+
+            retry_after = self.handle_rate_limit(response) or 2.0 ** (attempt + 2)
+            logger.info(f"Rate limit exceeded. Retrying after {retry_after} seconds.")
+            if limiter:
+                limiter.pause(retry_after)
+            else:
+                time.sleep(retry_after)
+        return response
+
     def call_api(self, content: str, model: str) -> Optional[str]:
         """Make API call and return processed response."""
+        response = None
         try:
-            data = {
-                "model": model,
-                "messages": self.format_messages(content),
-                "max_tokens": 4096,
-                "temperature": 0.7
-            }
-            
-            response = self.session.post(
-                self.api_url,
-                headers=self.get_headers(),
-                json=data
-            )
-            
-            if response.status_code == 429:  # Rate limit exceeded
-                retry_after = self.handle_rate_limit(response)
-                if retry_after:
-                    logger.info(f"Rate limit exceeded. Retrying after {retry_after} seconds.")
-                    time.sleep(retry_after)
-                    return self.call_api(content, model)
-                    
+            data = self.build_payload(content, model)
+
+            response = self.post_with_rate_limit(self.api_url, data, content, model)
             response.raise_for_status()
             return self.parse_response(response.json())
             
@@ -137,23 +301,116 @@ class BaseAPIClient:
                 logger.error(f"Response content: {response.text}")
             return None
 
+    def stream_api(self, content: str, model: str, deadline: float) -> Tuple[Optional[str], bool]:
+        """Stream a completion within a wall-clock deadline in seconds.
+
+        Returns the text received and whether the completion finished. On
+        timeout, an error event, a stop reason such as max tokens or a dropped
+        connection the text received so far is returned so the caller can
+        persist it. The deadline is enforced by a timer, so a stalled stream
+        is abandoned on time even when no event arrives.
+
+        The deadline covers the span from sending the request to the last
+        event. Time spent waiting for the rate limiter, or on 429 retries,
+        does not count.
+        """
+        pieces: List[str] = []
+        stop_reason = None
+        response = None
+        watchdog = None
+        timed_out = threading.Event()
+        try:
+            response = self.post_with_rate_limit(
+                self.get_stream_url(model),
+                self.build_payload(content, model, stream=True),
+                content,
+                model,
+                stream=True,
+                timeout=(STREAM_CONNECT_TIMEOUT, deadline)
+            )
+            # Start the clock when the request that answered was sent, after any rate-limiter wait
+            start_time = time.monotonic() - response.elapsed.total_seconds()
+            response.raise_for_status()
+            # Event streams rarely declare a charset and requests would assume ISO-8859-1
+            response.encoding = 'utf-8'
+
+            def abort_stream():
+                timed_out.set()
+                abort_response(response)
+
+            watchdog = threading.Timer(max(0.0, deadline - (time.monotonic() - start_time)), abort_stream)
+            watchdog.daemon = True
+            watchdog.start()
+
+            for event in self.iter_stream_events(response):
+                delta = self.parse_stream_event(event)
+                if delta:
+                    if not pieces:
+                        logger.info(f"First tokens from {model} after {time.monotonic() - start_time:.2f} seconds")
+                    pieces.append(delta)
+                stop_reason = self.stream_stop_reason(event) or stop_reason
+                if timed_out.is_set():
+                    break
+            if timed_out.is_set():
+                logger.warning(f"Streaming deadline of {deadline} seconds exceeded; keeping partial output")
+                return ''.join(pieces) or None, False
+            if stop_reason and stop_reason.lower() in INCOMPLETE_STOP_REASONS:
+                logger.warning(f"Stream from {model} stopped early ({stop_reason}); keeping partial output")
+                return ''.join(pieces) or None, False
+            return ''.join(pieces) or None, True
+
+        except Exception as e:
+            if timed_out.is_set():
+                logger.warning(f"Streaming deadline of {deadline} seconds exceeded; keeping partial output")
+            else:
+                logger.error(f"Streaming API request failed: {str(e)}")
+                if response is not None and not pieces:
+                    logger.error(f"Response content: {response.text}")
+            return ''.join(pieces) or None, False
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+            if response is not None:
+                response.close()
+
 class OpenAICompatibleClient(BaseAPIClient):
     """Client for OpenAI and compatible APIs."""
     
+    def __init__(self, api_key: str, api_url: Optional[str] = None, pool_size: int = 10, **kwargs):
+        super().__init__(api_key, api_url, pool_size, **kwargs)
+        self._openai_client: Optional[OpenAI] = None
+        self._openai_client_lock = threading.Lock()
+
     def _get_default_api_url(self) -> str:
         return "https://api.openai.com/v1/chat/completions"
 
+    def get_openai_client(self) -> OpenAI:
+        """Return the OpenAI SDK client, created once and shared by all threads."""
+        with self._openai_client_lock:
+            if self._openai_client is None:
+                # The SDK appends /chat/completions to base_url itself
+                base_url = re.sub(r'/chat/completions/?$', '', self.api_url)
+                self._openai_client = OpenAI(api_key=self.api_key, base_url=base_url)
+            return self._openai_client
+
     def call_api(self, content: str, model: str) -> Optional[str]:
         """Call API using the official OpenAI client."""
+        limiter = None
         try:
-            client = OpenAI(api_key=self.api_key, base_url=self.api_url)
+            client = self.get_openai_client()
+            limiter = self.wait_for_rate_limit(content, model)
             response = client.chat.completions.create(
                 model=model,
                 messages=self.format_messages(content),
-                max_tokens=4096,
-                temperature=0.7
+                **GENERATION_PARAMS
             )
             return response.choices[0].message.content
+        except RateLimitError as e:
+            # The SDK already retried; make the other workers back off as well
+            if limiter:
+                limiter.pause(self.handle_rate_limit(e.response) or 60.0)
+            logger.error(f"OpenAI API rate limit exceeded: {str(e)}")
+            return None
         except Exception as e:
             logger.error(f"OpenAI API request failed: {str(e)}")
             return None
@@ -165,6 +422,16 @@ class OpenAICompatibleClient(BaseAPIClient):
             logger.error(f"Error parsing OpenAI compatible response: {e}")
             return None
 
+    def parse_stream_event(self, event: Dict[str, Any]) -> Optional[str]:
+        if event.get('error'):
+            raise RuntimeError(event['error'])
+        choices = event.get('choices') or [{}]
+        return choices[0].get('delta', {}).get('content')
+
+    def stream_stop_reason(self, event: Dict[str, Any]) -> Optional[str]:
+        choices = event.get('choices') or [{}]
+        return choices[0].get('finish_reason')
+
 class AzureOpenAIClient(OpenAICompatibleClient):
     """Client for Azure OpenAI Services."""
     
@@ -186,6 +453,16 @@ class AnthropicClient(BaseAPIClient):
             'x-api-key': self.api_key,
             'anthropic-version': '2023-06-01'
         }
+
+    def build_payload(self, content: str, model: str, stream: bool = False) -> Dict[str, Any]:
+        # The Messages API takes the system prompt as a top-level field
+        return {
+            "model": model,
+            "system": SYSTEM_PROMPT,
+            "messages": [{"role": "user", "content": content}],
+            **GENERATION_PARAMS,
+            "stream": stream
+        }
         
     def parse_response(self, response: Dict[str, Any]) -> Optional[str]:
         try:
@@ -195,6 +472,18 @@ class AnthropicClient(BaseAPIClient):
             logger.error(f"Error parsing Anthropic response: {e}")
             return None
 
+    def parse_stream_event(self, event: Dict[str, Any]) -> Optional[str]:
+        if event.get('type') == 'error':
+            raise RuntimeError(event.get('error'))
+        if event.get('type') == 'content_block_delta':
+            return event.get('delta', {}).get('text')
+        return None
+
+    def stream_stop_reason(self, event: Dict[str, Any]) -> Optional[str]:
+        if event.get('type') == 'message_delta':
+            return event.get('delta', {}).get('stop_reason')
+        return None
+
 class GroqClient(OpenAICompatibleClient):
     """Client for Groq API."""
     
@@ -229,6 +518,20 @@ class OllamaClient(BaseAPIClient):
             logger.error(f"Error parsing Ollama response: {e}")
             return None
 
+    def iter_stream_events(self, response: requests.Response) -> Iterator[Dict[str, Any]]:
+        """Yield the objects of Ollama's newline-delimited JSON stream."""
+        for line in response.iter_lines(decode_unicode=True):
+            if line:
+                yield json.loads(line)
+
+    def parse_stream_event(self, event: Dict[str, Any]) -> Optional[str]:
+        if event.get('error'):
+            raise RuntimeError(event['error'])
+        return event.get('message', {}).get('content')
+
+    def stream_stop_reason(self, event: Dict[str, Any]) -> Optional[str]:
+        return event.get('done_reason') if event.get('done') else None
+
 class GeminiClient(BaseAPIClient):
     """Client for Google Gemini API."""
     
@@ -245,51 +548,47 @@ class GeminiClient(BaseAPIClient):
         return {
             "contents": [{
                 "parts": [{
-                    "text": f"You are a professional assistant, skilled in composing detailed and accurate news articles from multiple sources.\n\n{content}"
+                    "text": f"{SYSTEM_PROMPT}\n\n{content}"
                 }]
             }],
             "generationConfig": {
-                "temperature": 0.7,
-                "maxOutputTokens": 4096,
+                "temperature": GENERATION_PARAMS['temperature'],
+                "maxOutputTokens": GENERATION_PARAMS['max_tokens'],
                 "topP": 0.95,
                 "topK": 64
             }
         }
+
+    def build_payload(self, content: str, model: str, stream: bool = False) -> Dict[str, Any]:
+        # Truncate content if it's too long
+        return self.format_messages(truncate_content(content, MAX_TOKENS))
+
+    def get_model_url(self, model: str) -> str:
+        """Format URL with model and API key."""
+        url = self.api_url.format(model=model)
+        if '?' in url:
+            url += f"&key={self.api_key}"
+        else:
+            url += f"?key={self.api_key}"
+        return url
+
+    def get_stream_url(self, model: str) -> str:
+        return self.get_model_url(model).replace(':generateContent', ':streamGenerateContent') + "&alt=sse"
     
     def call_api(self, content: str, model: str) -> Optional[str]:
         """Make API call to Gemini and return processed response."""
+        response = None
         try:
-            # Truncate content if it's too long
-            truncated_content = truncate_content(content, MAX_TOKENS)
-            
-            # Format URL with model and API key
-            url = self.api_url.format(model=model)
-            if '?' in url:
-                url += f"&key={self.api_key}"
-            else:
-                url += f"?key={self.api_key}"
-            
-            data = self.format_messages(truncated_content)
-            
-            response = self.session.post(
-                url,
-                headers=self.get_headers(),
-                json=data
-            )
-            
-            if response.status_code == 429:  # Rate limit exceeded
-                retry_after = self.handle_rate_limit(response)
-                if retry_after:
-                    logger.info(f"Rate limit exceeded. Retrying after {retry_after} seconds.")
-                    time.sleep(retry_after)
-                    return self.call_api(content, model)
-                    
+            url = self.get_model_url(model)
+            data = self.build_payload(content, model)
+
+            response = self.post_with_rate_limit(url, data, content, model)
             response.raise_for_status()
             return self.parse_response(response.json())
             
         except Exception as e:
             logger.error(f"Gemini API request failed: {str(e)}")
-            if 'response' in locals():
+            if response is not None:
                 logger.error(f"Response content: {response.text}")
             return None
     
@@ -307,23 +606,97 @@ class GeminiClient(BaseAPIClient):
             logger.error(f"Error parsing Gemini response: {e}")
             return None
 
-def estimate_token_count(text: str) -> int:
-    """Estimate the number of tokens in a text."""
-    return len(text) // 4
+    def parse_stream_event(self, event: Dict[str, Any]) -> Optional[str]:
+        if event.get('error'):
+            raise RuntimeError(event['error'])
+        # Every streamed chunk has the shape of a complete response
+        return self.parse_response(event)
 
-def truncate_content(content: str, max_tokens: int) -> str:
-    """Truncate the content to fit within the maximum token limit."""
-    tokens = content.split()
-    truncated_content = []
-    current_tokens = 0
+    def stream_stop_reason(self, event: Dict[str, Any]) -> Optional[str]:
+        candidates = event.get('candidates') or [{}]
+        return candidates[0].get('finishReason')
+
+class CircuitBreaker:
+    """Stops routing to a provider for the rest of the run once it keeps failing.
+
+    Calls slower than latency_threshold seconds count as failures too.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, latency_threshold: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.latency_threshold = latency_threshold
+        self.consecutive_failures = 0
+        self.open = False
+        self.lock = threading.Lock()
 
-    for token in tokens:
-        current_tokens += len(token) // 4
-        if current_tokens > max_tokens:
-            break
-        truncated_content.append(token)
+    def record(self, success: bool, latency: float) -> None:
+        """Record the outcome of one call and trip the breaker if needed."""
+        with self.lock:
+            if success and not (self.latency_threshold and latency > self.latency_threshold):
+                self.consecutive_failures = 0
+                return
+            self.consecutive_failures += 1
+            if not self.open and self.consecutive_failures >= self.failure_threshold:
+                self.open = True
+                logger.warning(f"Circuit breaker opened for {self.name} after {self.consecutive_failures} "
+                               f"consecutive failed or slow calls")
 
-    return ' '.join(truncated_content)
+
+class ProviderChain:
+    """Ordered providers tried in turn, each behind its own circuit breaker.
+
+    Providers whose breaker is open are skipped, except the last one, which
+    is the fallback of last resort.
+    """
+
+    def __init__(self, providers: List[Tuple[Dict[str, Any], BaseAPIClient]], failure_threshold: int = 3,
+                 latency_threshold: Optional[float] = None):
+        self.providers = [
+            (api_config, client,
+             CircuitBreaker(f"{api_config['provider']}/{api_config['model']}", failure_threshold, latency_threshold))
+            for api_config, client in providers
+        ]
+
+    def api_configs(self) -> List[Dict[str, Any]]:
+        """Return the configuration of every provider in order."""
+        return [api_config for api_config, _, _ in self.providers]
+
+    def complete(self, content: str) -> Tuple[Optional[str], bool, Optional[Dict[str, Any]]]:
+        """Rewrite content with the first healthy provider that succeeds.
+
+        Returns the text, whether it is complete, and the configuration of the
+        provider that produced it. When no provider completes, the first
+        partial streamed output is returned, if any.
+        """
+        partial: Tuple[Optional[str], bool, Optional[Dict[str, Any]]] = (None, False, None)
+        last_position = len(self.providers) - 1
+        for position, (api_config, client, breaker) in enumerate(self.providers):
+            if breaker.open and position < last_position:
+                continue
+            start_time = time.monotonic()
+            if api_config.get('streaming'):
+                text, complete = client.stream_api(content, api_config['model'],
+                                                   api_config.get('stream_deadline', 300))
+            else:
+                text, complete = client.call_api(content, api_config['model']), True
+            breaker.record(bool(text) and complete, time.monotonic() - start_time)
+
+            if text and complete:
+                return text, True, api_config
+            if text and partial[0] is None:
+                partial = (text, False, api_config)
+            if position < last_position:
+                logger.warning(f"Provider {breaker.name} failed; trying the next provider")
+        return partial
+
+def estimate_token_count(text: str, tokenizer: Optional[str] = DEFAULT_ENCODING) -> int:
+    """Estimate the number of tokens in a text."""
+    return get_token_counter(tokenizer).count(text)
+
+def truncate_content(content: str, max_tokens: int, tokenizer: Optional[str] = DEFAULT_ENCODING) -> str:
+    """Truncate the content to fit within the maximum token limit."""
+    return get_token_counter(tokenizer).truncate(content, max_tokens)
 
 def ensure_proper_punctuation(text: str) -> str:
     """Ensure proper punctuation in the text."""
@@ -347,60 +720,401 @@ def read_content_prefix(prefix_file_path: str) -> str:
         logger.error(f"Error reading content prefix file {prefix_file_path}: {e}")
         return ""
 
-def process_json_file(filepath: str, api_config: Dict[str, Any], content_prefix: str, 
-                     rewritten_folder: str) -> None:
-    """Process a JSON file using the specified API."""
+def load_group(filepath: str) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+    """Load the articles of a group file and its story id, if any."""
+    with open(filepath, 'r', encoding='utf-8') as file:
+        json_data = json.load(file)
+
+    story_id = None
+    if isinstance(json_data, dict) and isinstance(json_data.get('articles'), list):
+        # Group and story files produced by main.py wrap the articles
+        story_id = json_data.get('story_id')
+        json_data = json_data['articles']
+    elif isinstance(json_data, dict):
+        json_data = [json_data]
+    elif isinstance(json_data, str):
+        logger.error(f"Expected list of dictionaries but got a string. File: {filepath}")
+        return None, None
+    return json_data, story_id
+
+def build_source_blocks(json_data: List[Dict[str, Any]]) -> List[str]:
+    """Format the articles of a group as numbered source blocks."""
+    return [
+        f"[source {idx + 1}] {item.get('content', 'No content provided')}"
+        for idx, item in enumerate(json_data)
+    ]
+
+def get_cached_rewrite(cache: Optional[ResponseCache], chain: ProviderChain, content_prefix: str,
+                       group_content: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """Return a cached rewrite of the group by any provider of the chain, and that provider's config."""
+    if cache is None:
+        return None, None
+    for provider_config in chain.api_configs():
+        cached_content = cache.get(response_key(provider_config['provider'], provider_config['model'],
+                                                content_prefix, group_content, GENERATION_PARAMS))
+        if cached_content:
+            return cached_content, provider_config
+    return None, None
+
+def process_json_file(filepath: str, api_config: Dict[str, Any], content_prefix: str,
+                     rewritten_folder: str, client: Optional[BaseAPIClient] = None,
+                     cache: Optional[ResponseCache] = None,
+                     chain: Optional[ProviderChain] = None) -> Optional[str]:
+    """Process a JSON file using the specified API and return the path of the rewritten file.
+
+    Pass a shared client when processing many files so its connection pool
+    is reused; otherwise a new client is created for this file. A provider
+    chain, when given, replaces both and fails over between providers. With
+    a response cache, unchanged groups are rewritten from the cache without
+    calling the API. When api_config enables streaming, a rewrite cut off by
+    the deadline is saved as partial but not reported (nor cached), so it is
+    retried on the next run.
+    """
+    logger.info(f"Processing file: {filepath}")
     try:
-        with open(filepath, 'r', encoding='utf-8') as file:
-            json_data = json.load(file)
-            
-        if isinstance(json_data, dict):
-            json_data = [json_data]
-        elif isinstance(json_data, str):
-            logger.error(f"Expected list of dictionaries but got a string. File: {filepath}")
-            return
-            
-        combined_content = content_prefix + "\n".join(
-            f"[source {idx + 1}] {item.get('content', 'No content provided')}"
-            for idx, item in enumerate(json_data)
-        )
+        json_data, story_id = load_group(filepath)
+        if json_data is None:
+            return None
 
-        if estimate_token_count(combined_content) > MAX_TOKENS:
-            combined_content = truncate_content(combined_content, MAX_TOKENS)
+        source_blocks = build_source_blocks(json_data)
+        group_content = "\n".join(source_blocks)
 
-        # Create appropriate API client
-        client = APIClientFactory.create_client(
-            provider=api_config['provider'],
-            api_key=api_config['api_key'],
-            api_url=api_config.get('api_url')
-        )
+        # Over-long prompts are cut evenly across sources instead of dropping the last ones
+        combined_content = fair_truncate(content_prefix, source_blocks, MAX_TOKENS,
+                                         get_token_counter(api_config.get('tokenizer', DEFAULT_ENCODING)))
 
-        rewritten_content = client.call_api(combined_content, api_config['model'])
+        if chain is None:
+            # Create appropriate API client
+            if client is None:
+                client = APIClientFactory.create_client(
+                    provider=api_config['provider'],
+                    api_key=api_config['api_key'],
+                    api_url=api_config.get('api_url'),
+                    rate_limits=api_config.get('rate_limits')
+                )
+            chain = ProviderChain([(api_config, client)])
 
-        if rewritten_content:
+        cached_content, provider_config = get_cached_rewrite(cache, chain, content_prefix, group_content)
+        if cached_content:
+            logger.info(f"Using cached response for {filepath}")
+            return save_rewritten_content(
+                cached_content,
+                json_data,
+                filepath,
+                rewritten_folder,
+                provider_config,
+                story_id=story_id
+            )
+
+        rewritten_content, complete, used_config = chain.complete(combined_content)
+
+        if rewritten_content and not complete:
             save_rewritten_content(
                 rewritten_content,
                 json_data,
                 filepath,
                 rewritten_folder,
-                api_config
+                used_config,
+                story_id=story_id,
+                partial=True
             )
-        else:
-            logger.error("Failed to get rewritten content from API.")
+            return None
+
+        if rewritten_content:
+            if cache is not None:
+                cache.put(response_key(used_config['provider'], used_config['model'], content_prefix,
+                                       group_content, GENERATION_PARAMS), rewritten_content)
+            return save_rewritten_content(
+                rewritten_content,
+                json_data,
+                filepath,
+                rewritten_folder,
+                used_config,
+                story_id=story_id
+            )
+        logger.error("Failed to get rewritten content from API.")
 
     except Exception as e:
         logger.error(f"Error processing file {filepath}: {str(e)}")
+    return None
+
+BATCH_INSTRUCTIONS = (
+    "\n\nThe text below contains several independent groups of sources, each introduced by a "
+    "'=== group <id> ===' header. Apply the instructions above to every group separately. "
+    "Answer only with a JSON array containing one object per group, with the keys \"id\" "
+    "(the group id from its header) and \"content\" (the article written for that group).\n\n"
+)
+
+def plan_batches(filepaths: List[str], content_prefix: str, batch_config: Dict[str, Any],
+                 tokenizer: Optional[str] = DEFAULT_ENCODING) -> Tuple[List[List[str]], List[str]]:
+    """Pack small groups into batches that fit the batch token budget.
+
+    Returns the batches and the files that are sent on their own.
+    """
+    counter = get_token_counter(tokenizer)
+    max_groups = batch_config.get('max_groups', 5)
+    max_tokens = batch_config.get('max_tokens', 6000)
+    max_group_tokens = batch_config.get('max_group_tokens', 800)
+    budget = max_tokens - counter.count(content_prefix + BATCH_INSTRUCTIONS)
+
+    batches: List[List[str]] = []
+    singles: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for filepath in filepaths:
+        try:
+            json_data, _ = load_group(filepath)
+        except (OSError, json.JSONDecodeError):
+            json_data = None
+        group_tokens = counter.count("\n".join(build_source_blocks(json_data))) if json_data else None
+        if group_tokens is None or group_tokens > max_group_tokens:
+            singles.append(filepath)
+            continue
+        if current and (len(current) >= max_groups or current_tokens + group_tokens > budget):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(filepath)
+        current_tokens += group_tokens
+    if current:
+        batches.append(current)
+
+    # A batch of one gains nothing over a regular request
+    singles.extend(batch[0] for batch in batches if len(batch) == 1)
+    return [batch for batch in batches if len(batch) > 1], singles
+
+def parse_batch_response(text: str) -> Dict[str, str]:
+    """Extract the group id -> content map from a batched response, tolerating code fences."""
+    start, end = text.find('['), text.rfind(']')
+    if start == -1 or end <= start:
+        return {}
+    try:
+        items = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(items, list):
+        return {}
+    return {
+        str(item['id']): item['content'] for item in items
+        if isinstance(item, dict) and 'id' in item and isinstance(item.get('content'), str) and item['content']
+    }
+
+def process_batch(filepaths: List[str], api_config: Dict[str, Any], content_prefix: str,
+                  rewritten_folder: str, chain: ProviderChain,
+                  cache: Optional[ResponseCache] = None) -> List[Optional[str]]:
+    """Rewrite several small groups with one request and return the output path of each.
+
+    Groups missing from the response, or all of them if it cannot be
+    parsed, are retried with individual requests.
+    """
+    logger.info(f"Processing batch of {len(filepaths)} files")
+    outputs: Dict[str, Optional[str]] = {}
+    groups = {}
+    for filepath in filepaths:
+        try:
+            json_data, story_id = load_group(filepath)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Error processing file {filepath}: {str(e)}")
+            outputs[filepath] = None
+            continue
+        if json_data is None:
+            outputs[filepath] = None
+            continue
+        group_content = "\n".join(build_source_blocks(json_data))
+        cached_content, provider_config = get_cached_rewrite(cache, chain, content_prefix, group_content)
+        if cached_content:
+            logger.info(f"Using cached response for {filepath}")
+            outputs[filepath] = save_rewritten_content(cached_content, json_data, filepath, rewritten_folder,
+                                                       provider_config, story_id=story_id)
+            continue
+        groups[Path(filepath).stem] = (filepath, json_data, story_id, group_content)
+
+    if len(groups) > 1:
+        prompt = content_prefix + BATCH_INSTRUCTIONS + "\n\n".join(
+            f"=== group {group_id} ===\n{group_content}"
+            for group_id, (_, _, _, group_content) in groups.items()
+        )
+        rewritten_content, complete, used_config = chain.complete(prompt)
+        rewrites = parse_batch_response(rewritten_content) if rewritten_content and complete else {}
+        if not rewrites:
+            logger.warning(f"Could not parse batched response; processing {len(groups)} files individually")
+
+        for group_id, (filepath, json_data, story_id, group_content) in list(groups.items()):
+            if group_id not in rewrites:
+                continue
+            if cache is not None:
+                cache.put(response_key(used_config['provider'], used_config['model'], content_prefix,
+                                       group_content, GENERATION_PARAMS), rewrites[group_id])
+            outputs[filepath] = save_rewritten_content(rewrites[group_id], json_data, filepath, rewritten_folder,
+                                                       used_config, story_id=story_id)
+            del groups[group_id]
+
+    for filepath, _, _, _ in groups.values():
+        outputs[filepath] = process_json_file(filepath, api_config, content_prefix, rewritten_folder,
+                                              cache=cache, chain=chain)
+    return [outputs.get(filepath) for filepath in filepaths]
+
+def create_batch_backend(job_config: Dict[str, Any], chain: ProviderChain) -> BatchBackend:
+    """Create the configured batch backend.
+
+    The local backend completes jobs through the provider chain when they are
+    collected; the OpenAI backend needs an OpenAI-compatible primary provider.
+    """
+    backend_name = job_config.get('backend', 'local')
+    if backend_name == 'openai':
+        _, client, _ = chain.providers[0]
+        if not isinstance(client, OpenAICompatibleClient):
+            raise ValueError("The openai batch backend requires an OpenAI-compatible provider")
+        return OpenAIBatchBackend(client.get_openai_client(), job_config.get('completion_window', '24h'))
+    if backend_name == 'local':
+        def complete(body: Dict[str, Any]) -> Optional[Tuple[str, str, str]]:
+            text, complete, used_config = chain.complete(body['messages'][-1]['content'])
+            return (text, used_config['provider'], used_config['model']) if text and complete else None
+        return LocalFileBatchBackend(job_config.get('directory', 'cache/batch_jobs'), complete)
+    raise ValueError(f"Unsupported batch backend: {backend_name}")
+
+def submit_batch_job(filepaths: List[str], api_config: Dict[str, Any], content_prefix: str,
+                     backend: BatchBackend, job_store: BatchJobStore, job_config: Dict[str, Any],
+                     input_hashes: Dict[Path, str], settings_digest: str,
+                     provider_configs: Optional[List[Dict[str, Any]]] = None) -> Optional[str]:
+    """Write the prompts of all files not already in a pending job to a batch file and submit it.
+
+    Each request keeps a cache key for every provider of the chain, since
+    the local backend may complete it through a fallback provider.
+    """
+    pending_ids = job_store.pending_ids()
+    counter = get_token_counter(api_config.get('tokenizer', DEFAULT_ENCODING))
+    batch_requests = []
+    job_requests = {}
+    for filepath in filepaths:
+        # Group files are renumbered every run, so requests are keyed by content too
+        input_hash = input_hashes.get(Path(filepath)) or file_hash(filepath)
+        custom_id = f"{Path(filepath).stem}-{input_hash[:16]}"
+        if custom_id in pending_ids:
+            continue
+        try:
+            json_data, story_id = load_group(filepath)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Error processing file {filepath}: {str(e)}")
+            continue
+        if json_data is None:
+            continue
+        source_blocks = build_source_blocks(json_data)
+        prompt = fair_truncate(content_prefix, source_blocks, MAX_TOKENS, counter)
+        batch_requests.append({'custom_id': custom_id, 'body': {
+            "model": api_config['model'],
+            "messages": [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}],
+            **GENERATION_PARAMS
+        }})
+        # Everything needed to save the result later, even if the group file is replaced meanwhile
+        job_requests[custom_id] = {
+            'filepath': filepath,
+            'input_hash': input_hash,
+            'cache_keys': {
+                f"{provider_config['provider']}/{provider_config['model']}": response_key(
+                    provider_config['provider'], provider_config['model'], content_prefix,
+                    "\n".join(source_blocks), GENERATION_PARAMS)
+                for provider_config in provider_configs or [api_config]
+            },
+            'story_id': story_id,
+            'articles': [
+                {key: item[key] for key in ('title', 'link', 'duplicate_links', 'categories') if key in item}
+                for item in json_data
+            ]
+        }
+
+    if not batch_requests:
+        logger.info("No files to submit as a batch job")
+        return None
+
+    batch_path = Path(job_config.get('directory', 'cache/batch_jobs')) / f"batch_{int(time.time())}.jsonl"
+    write_batch_file(str(batch_path), batch_requests)
+    job_id = backend.submit(str(batch_path))
+    job_store.add(job_id, backend.name, job_requests, {
+        'provider': api_config['provider'],
+        'model': api_config['model'],
+        'settings_hash': settings_digest
+    })
+    logger.info(f"Submitted batch job {job_id} with {len(batch_requests)} requests")
+    return job_id
+
+def collect_batch_jobs(backend: BatchBackend, job_store: BatchJobStore, rewritten_folder: str,
+                       manifest: Optional[RewriteManifest] = None,
+                       cache: Optional[ResponseCache] = None) -> int:
+    """Ingest the results of finished batch jobs and return the number of files rewritten."""
+    rewritten = 0
+    for job_id, job in list(job_store.jobs.items()):
+        if job['backend'] != backend.name:
+            logger.warning(f"Skipping batch job {job_id} submitted to the {job['backend']} backend")
+            continue
+        status = backend.status(job_id)
+        if status == 'pending':
+            logger.info(f"Batch job {job_id} is still pending")
+            continue
+        if status == 'failed':
+            logger.error(f"Batch job {job_id} failed; its files will be submitted again")
+            job_store.remove(job_id)
+            continue
+
+        settings = job['settings']
+        results = backend.fetch_results(job_id)
+        for custom_id, request in job['requests'].items():
+            result = results.get(custom_id)
+            if not result:
+                logger.error(f"No result for {custom_id} in batch job {job_id}")
+                continue
+            content = result['content']
+            # Credit the provider that answered, which may be a fallback of the chain
+            answered = dict(settings)
+            if result.get('provider'):
+                answered.update(provider=result['provider'], model=result['model'])
+            cache_key = request.get('cache_keys', {}).get(f"{answered['provider']}/{answered['model']}")
+            if cache is not None and cache_key:
+                cache.put(cache_key, content)
+            # A later run may have reused the file name for other articles
+            try:
+                current_hash = file_hash(request['filepath'])
+            except OSError:
+                current_hash = None
+            if current_hash != request.get('input_hash'):
+                logger.warning(f"Discarding stale result for {request['filepath']} in batch job {job_id}: "
+                               f"the file changed since submission")
+                continue
+            output_path = save_rewritten_content(content, request['articles'], request['filepath'],
+                                                 rewritten_folder, answered, story_id=request.get('story_id'))
+            if output_path:
+                rewritten += 1
+                if manifest is not None:
+                    manifest.record(Path(request['filepath']).name, request['input_hash'],
+                                    settings['settings_hash'], output_path)
+        job_store.remove(job_id)
+        logger.info(f"Collected batch job {job_id}")
+    return rewritten
 
 def save_rewritten_content(content: str, original_data: List[Dict], filepath: str,
-                         rewritten_folder: str, api_config: Dict[str, Any]) -> None:
-    """Save the rewritten content to a new JSON file."""
+                         rewritten_folder: str, api_config: Dict[str, Any],
+                         story_id: Optional[str] = None, partial: bool = False) -> Optional[str]:
+    """Save the rewritten content to a new JSON file and return its path.
+
+    Partial rewrites, cut off by the streaming deadline, are flagged as such
+    and kept in the partial subfolder, so they never replace a complete
+    rewrite nor get published; a later complete rewrite removes them.
+    """
     cleaned_content = re.sub(r'\*\*', '', content)
     cleaned_content = re.sub(r'\n\n+', ' ', cleaned_content)
     cleaned_content = re.sub(r'Fonti:.*$', '', cleaned_content, flags=re.MULTILINE)
     cleaned_content = re.sub(r'Fonte:.*$', '', cleaned_content, flags=re.MULTILINE)
     cleaned_content = ensure_proper_punctuation(cleaned_content)
 
-    links = [item.get('link') for item in original_data if 'link' in item]
+    links = []
+    categories = []
+    for item in original_data:
+        if 'link' in item:
+            links.append(item.get('link'))
+        # Sources collapsed into this article as near-duplicates by main.py
+        links.extend(item.get('duplicate_links', []))
+        for category in item.get('categories', []):
+            if category not in categories:
+                categories.append(category)
 
     new_data = {
         'title': original_data[0].get('title', 'No Title'),
@@ -410,14 +1124,26 @@ def save_rewritten_content(content: str, original_data: List[Dict], filepath: st
         'api': api_config['provider'],
         'model': api_config['model']
     }
+    if categories:
+        new_data['categories'] = categories
+    if story_id:
+        new_data['story_id'] = story_id
+    if partial:
+        new_data['partial'] = True
 
-    new_filename = Path(rewritten_folder) / (Path(filepath).stem + '_rewritten.json')
+    partial_filename = Path(rewritten_folder) / PARTIAL_SUBFOLDER / (Path(filepath).stem + '_rewritten.json')
+    new_filename = partial_filename if partial else Path(rewritten_folder) / (Path(filepath).stem + '_rewritten.json')
     try:
+        new_filename.parent.mkdir(parents=True, exist_ok=True)
         with open(new_filename, 'w', encoding='utf-8') as outfile:
             json.dump(new_data, outfile, ensure_ascii=False, indent=4)
-        logger.info(f"Rewritten file saved to {new_filename}")
+        if not partial and partial_filename.exists():
+            partial_filename.unlink()
+        logger.info(f"{'Partial rewrite' if partial else 'Rewritten file'} saved to {new_filename}")
+        return str(new_filename)
     except IOError as e:
         logger.error(f"Error writing to {new_filename}: {e}")
+        return None
 
 def validate_config(api_config: Dict[str, Any]) -> None:
     """Validate the API configuration."""
@@ -502,7 +1228,8 @@ def map_api_config(config_api_config: Dict[str, Any]) -> Dict[str, Any]:
 def main(config_path: str, prompt_path: Optional[str] = None, api: Optional[str] = None,
          api_key: Optional[str] = None, model: Optional[str] = None, 
          api_url: Optional[str] = None, output_folder: Optional[str] = None,
-         rewritten_folder: Optional[str] = None) -> None:
+         rewritten_folder: Optional[str] = None, max_in_flight: Optional[int] = None,
+         force: bool = False, stream: Optional[bool] = None, batch_mode: Optional[str] = None) -> None:
     """Main function to process JSON files with LLM API."""
     try:
         with open(config_path, 'r', encoding='utf-8') as file:
@@ -513,10 +1240,16 @@ def main(config_path: str, prompt_path: Optional[str] = None, api: Optional[str]
 
     api_config = config.get('api_config', {})
     folder_config = config.get('folders', {})
+    processing_config = config.get('llm_processing', {})
     prompt_file_path = prompt_path or config.get('prompt_file', "")
 
     # Map API configuration from GUI format to processor format
     mapped_api_config = map_api_config(api_config)
+    mapped_api_config['rate_limits'] = api_config.get('rate_limits', {})
+    mapped_api_config['tokenizer'] = processing_config.get('tokenizer', DEFAULT_ENCODING)
+    configure_tokenizer_cache(processing_config.get('tokenizer_cache_dir', DEFAULT_CACHE_DIR))
+    mapped_api_config['streaming'] = stream if stream is not None else processing_config.get('streaming', False)
+    mapped_api_config['stream_deadline'] = processing_config.get('stream_deadline', 300)
 
     # Override with environment variables and CLI arguments
     mapped_api_config.update({
@@ -534,6 +1267,26 @@ def main(config_path: str, prompt_path: Optional[str] = None, api: Optional[str]
     prompt_file_path = prompt_path or os.getenv('PROMPT_FILE', prompt_file_path)
     content_prefix = read_content_prefix(prompt_file_path) if prompt_file_path else config.get('content_prefix', "")
 
+    # Number of files rewritten concurrently
+    max_in_flight = max(1, int(max_in_flight or os.getenv('MAX_IN_FLIGHT', processing_config.get('max_in_flight', DEFAULT_MAX_IN_FLIGHT))))
+
+    # Fallback providers tried in order when the selected one fails
+    provider_configs = [mapped_api_config]
+    for fallback_api in api_config.get('provider_chain') or []:
+        fallback_config = map_api_config({**api_config, 'selected_api': fallback_api})
+        if fallback_config['provider'].lower() == mapped_api_config['provider'].lower():
+            continue
+        for key in ('rate_limits', 'tokenizer', 'streaming', 'stream_deadline'):
+            fallback_config[key] = mapped_api_config[key]
+        try:
+            validate_config(fallback_config)
+        except ValueError as e:
+            logger.warning(f"Skipping fallback provider {fallback_api}: {e}")
+            continue
+        provider_configs.append(fallback_config)
+    breaker_config = processing_config.get('circuit_breaker', {})
+
+    cache = None
     try:
         # Validate configuration
         validate_config(mapped_api_config)
@@ -541,24 +1294,126 @@ def main(config_path: str, prompt_path: Optional[str] = None, api: Optional[str]
         # Create rewritten folder if it doesn't exist
         Path(rewritten_folder).mkdir(parents=True, exist_ok=True)
 
+        # One pooled client per provider is shared by all workers
+        chain = ProviderChain(
+            [
+                (provider_config, APIClientFactory.create_client(
+                    provider=provider_config['provider'],
+                    api_key=provider_config['api_key'],
+                    api_url=provider_config.get('api_url'),
+                    pool_size=max_in_flight,
+                    rate_limits=provider_config.get('rate_limits')
+                ))
+                for provider_config in provider_configs
+            ],
+            failure_threshold=breaker_config.get('failure_threshold', 3),
+            latency_threshold=breaker_config.get('latency_threshold')
+        )
+        if len(provider_configs) > 1:
+            logger.info("Provider chain: " + " -> ".join(
+                f"{provider_config['provider']}/{provider_config['model']}" for provider_config in provider_configs
+            ))
+
+        # Responses of unchanged groups are reused across runs
+        cache_config = config.get('llm_cache', {})
+        if cache_config.get('enabled', False) and cache_config.get('path'):
+            cache = ResponseCache(cache_config['path'], cache_config.get('ttl_days', 7),
+                                  cache_config.get('max_size_mb', 100))
+
+        # Skip files already rewritten from the same content with the same settings
+        manifest = None
+        settings_digest = settings_hash([(provider_config['provider'], provider_config['model'])
+                                         for provider_config in provider_configs],
+                                        content_prefix, GENERATION_PARAMS)
+        manifest_path = processing_config.get('manifest_file')
+        if manifest_path and processing_config.get('skip_unchanged', True):
+            manifest = RewriteManifest(manifest_path)
+
+        # Offline batch jobs are submitted in one run and collected in a later one
+        job_config = processing_config.get('batch_jobs', {})
+        if batch_mode:
+            job_store = BatchJobStore(job_config.get('state_file', 'cache/batch_jobs.json'))
+            backend = create_batch_backend(job_config, chain)
+        if batch_mode == 'collect':
+            collect_batch_jobs(backend, job_store, rewritten_folder, manifest, cache)
+            return
+
         # Process all JSON files in the output folder
         json_files = list(Path(output_folder).glob('*.json'))
         if not json_files:
             logger.warning(f"No JSON files found in {output_folder}")
             return
 
-        for json_file in json_files:
-            logger.info(f"Processing file: {json_file}")
-            process_json_file(
-                filepath=str(json_file),
-                api_config=mapped_api_config,
-                content_prefix=content_prefix,
-                rewritten_folder=rewritten_folder
-            )
+        input_hashes = {json_file: file_hash(str(json_file)) for json_file in json_files}
+        if manifest is not None:
+            pending_files = [
+                json_file for json_file in json_files
+                if force or not manifest.is_up_to_date(json_file.name, input_hashes[json_file], settings_digest)
+            ]
+            logger.info(f"Skipping {len(json_files) - len(pending_files)} up-to-date files")
+            json_files = pending_files
+            if not json_files:
+                return
+
+        if batch_mode == 'submit':
+            submit_batch_job([str(json_file) for json_file in json_files], mapped_api_config, content_prefix,
+                             backend, job_store, job_config, input_hashes, settings_digest, provider_configs)
+            return
+
+        # Small groups can share one request
+        batch_config = processing_config.get('batching', {})
+        batches: List[List[str]] = []
+        single_files = [str(json_file) for json_file in json_files]
+        if batch_config.get('enabled', False):
+            batches, single_files = plan_batches(single_files, content_prefix, batch_config,
+                                                 mapped_api_config['tokenizer'])
+            logger.info(f"Packed {sum(map(len, batches))} small files into {len(batches)} batched requests")
+
+        logger.info(f"Processing {len(json_files)} files with up to {max_in_flight} requests in flight")
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            futures = {
+                executor.submit(
+                    process_batch,
+                    filepaths=batch,
+                    api_config=mapped_api_config,
+                    content_prefix=content_prefix,
+                    rewritten_folder=rewritten_folder,
+                    chain=chain,
+                    cache=cache
+                ): batch
+                for batch in batches
+            }
+            futures.update({
+                executor.submit(
+                    process_json_file,
+                    filepath=filepath,
+                    api_config=mapped_api_config,
+                    content_prefix=content_prefix,
+                    rewritten_folder=rewritten_folder,
+                    cache=cache,
+                    chain=chain
+                ): [filepath]
+                for filepath in single_files
+            })
+            for future in as_completed(futures):
+                filepaths = futures[future]
+                output_paths = future.result()
+                if not isinstance(output_paths, list):
+                    output_paths = [output_paths]
+                for filepath, output_path in zip(filepaths, output_paths):
+                    json_file = Path(filepath)
+                    logger.info(f"Finished file: {json_file}")
+                    if manifest is not None and output_path:
+                        manifest.record(json_file.name, input_hashes[json_file], settings_digest, output_path)
+        logger.info(f"Processed {len(json_files)} files in {time.time() - start_time:.2f} seconds")
 
     except Exception as e:
         logger.error(f"Error in main execution: {str(e)}")
         raise
+    finally:
+        if cache is not None:
+            cache.close()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Process JSON files with LLM API')
@@ -578,6 +1433,14 @@ if __name__ == "__main__":
                       help='Output folder containing JSON files to process')
     parser.add_argument('--rewritten_folder', type=str,
                       help='Folder to save the rewritten JSON files')
+    parser.add_argument('--max_in_flight', type=int,
+                      help='Maximum number of files rewritten concurrently')
+    parser.add_argument('--force', action='store_true',
+                      help='Rewrite all files, including those that are already up to date')
+    parser.add_argument('--stream', action='store_true', default=None,
+                      help='Stream completions and save partial output when the deadline is hit')
+    parser.add_argument('--batch_mode', choices=['submit', 'collect'],
+                      help='Submit all pending files as an offline batch job, or collect finished jobs')
 
     args = parser.parse_args()
 
@@ -590,7 +1453,11 @@ if __name__ == "__main__":
             model=args.model,
             api_url=args.api_url,
             output_folder=args.output_folder,
-            rewritten_folder=args.rewritten_folder
+            rewritten_folder=args.rewritten_folder,
+            max_in_flight=args.max_in_flight,
+            force=args.force,
+            stream=args.stream,
+            batch_mode=args.batch_mode
         )
     except KeyboardInterrupt:
         logger.info("Process interrupted by user")
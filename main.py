@@ -8,21 +8,35 @@ import time
 import sys
 import json
 import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from urllib.parse import urlparse
 
 
 from typing import List, Dict, Any, Optional, Tuple
 import yaml
 import feedparser
+import requests
+from requests.adapters import HTTPAdapter
 import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
 import nltk
-from langdetect import detect
 
 from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer, HashingVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 from sklearn.cluster import AgglomerativeClustering, DBSCAN, KMeans
 from nltk.stem import WordNetLemmatizer, SnowballStemmer
 from nltk.corpus import stopwords
 from logging_setup import setup_logging
+from feed_cache import FeedCache
+from article_store import SeenArticleStore
+import language_detection
+from language_detection import LanguageCache
+from story_store import StoryStore
+from near_duplicates import collapse_near_duplicates, source_count
 
 # Setup logging
 logger = setup_logging()
@@ -31,6 +45,9 @@ logger = setup_logging()
 nltk.download('wordnet', quiet=True)
 nltk.download('stopwords', quiet=True)
 
+# User agent sent when downloading feeds
+FEED_USER_AGENT = "UglyFeed/1.0 (+https://github.com/fabriziosalmi/UglyFeed)"
+
 
 def load_config(config_path: str) -> Dict[str, Any]:
     """Load configuration from a YAML file."""
@@ -79,8 +96,119 @@ def merge_configs(yaml_cfg: Dict[str, Any], env_cfg: Dict[str, Any], cli_cfg: Di
     return final_config
 
 
-def fetch_feeds_from_file(file_path: str) -> List[Dict[str, str]]:
-    """Fetch and parse RSS feeds from a file containing URLs with enhanced error handling."""
+class HostThrottle:
+    """Limit the number of concurrent downloads against the same host."""
+
+    def __init__(self, per_host_limit: int):
+        self.per_host_limit = max(1, per_host_limit)
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def slot(self, host: str) -> threading.BoundedSemaphore:
+        """Return the semaphore guarding downloads for the given host."""
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._semaphores[host]
+
+
+def create_fetch_session(max_concurrency: int) -> requests.Session:
+    """Create a requests session whose connection pool matches the fetch concurrency."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'User-Agent': FEED_USER_AGENT})
+    return session
+
+
+def extract_feed_articles(feed: Any, url: str) -> List[Dict[str, str]]:
+    """Extract article dictionaries from a parsed feed."""
+    # Check if feed parsing was successful
+    if feed.bozo:
+        logger.warning("Feed %s has parsing warnings: %s", url, feed.bozo_exception)
+
+    if not feed.entries:
+        logger.warning("No entries found in feed: %s", url)
+        return []
+
+    # Extract articles with better error handling
+    feed_articles = []
+    for entry in feed.entries:
+        title = getattr(entry, 'title', '')
+        description = getattr(entry, 'description', '') or getattr(entry, 'summary', '')
+        link = getattr(entry, 'link', '')
+
+        # Skip entries with missing critical data
+        if not title and not description:
+            logger.warning("Skipping entry with no title or description from %s", url)
+            continue
+
+        # Use fallback values for missing data
+        article = {
+            'title': title or 'No Title',
+            'content': description or 'No Content',
+            'link': link or url
+        }
+        # Entry categories, used by json2rss.py to route stories into category feeds
+        categories = [tag.get('term') for tag in getattr(entry, 'tags', None) or [] if tag.get('term')]
+        if categories:
+            article['categories'] = categories
+        feed_articles.append(article)
+
+    return feed_articles
+
+
+def fetch_feed(url: str, session: requests.Session, throttle: HostThrottle, timeout: float,
+               feed_cache: Optional[FeedCache] = None) -> List[Dict[str, str]]:
+    """Download a single feed and hand the raw bytes to feedparser.
+
+    When a feed cache is given, the request is made conditional on the stored
+    validators and a 304 Not Modified answer reuses the cached articles.
+    """
+    parsed_url = urlparse(url)
+    if parsed_url.scheme not in ('http', 'https'):
+        # Local files and exotic schemes are left to feedparser itself
+        return extract_feed_articles(feedparser.parse(url), url)
+
+    request_headers = feed_cache.conditional_headers(url) if feed_cache else {}
+    with throttle.slot(parsed_url.netloc):
+        response = session.get(url, timeout=timeout, headers=request_headers)
+
+    if response.status_code == 304 and feed_cache:
+        cached_articles = feed_cache.get_articles(url)
+        if cached_articles is not None:
+            logger.info("Feed %s not modified; reusing %d cached articles", url, len(cached_articles))
+            return cached_articles
+        # Validators without cached entries: retry unconditionally
+        with throttle.slot(parsed_url.netloc):
+            response = session.get(url, timeout=timeout)
+    response.raise_for_status()
+
+    # Content-Location lets feedparser resolve relative links against the feed URL
+    response_headers = {key.lower(): value for key, value in response.headers.items()}
+    response_headers.setdefault('content-location', response.url)
+    feed = feedparser.parse(response.content, response_headers=response_headers)
+    feed_articles = extract_feed_articles(feed, url)
+    if feed_cache:
+        feed_cache.update(url, response_headers, feed_articles)
+    return feed_articles
+
+
+def fetch_feeds_from_file(file_path: str, fetch_config: Optional[Dict[str, Any]] = None) -> List[Dict[str, str]]:
+    """Fetch and parse RSS feeds from a file containing URLs with enhanced error handling.
+
+    Feeds are downloaded concurrently by a bounded thread pool; articles are
+    returned in the same order as the URLs appear in the file. If
+    ``fetching.cache_file`` is set, ETag / Last-Modified validators are kept
+    between runs and unchanged feeds are served from the cache.
+    """
+    fetch_config = fetch_config or {}
+    max_concurrency = max(1, int(fetch_config.get('max_concurrency', 8)))
+    per_host_limit = int(fetch_config.get('per_host_limit', 2))
+    timeout = float(fetch_config.get('timeout', 20))
+    cache_file = fetch_config.get('cache_file')
+
     articles = []
     try:
         with open(file_path, 'r', encoding='utf-8') as file:
@@ -90,54 +218,51 @@ def fetch_feeds_from_file(file_path: str) -> List[Dict[str, str]]:
             logger.warning("No URLs found in %s", file_path)
             return articles
 
-        logger.info("Found %d URLs to process", len(urls))
+        logger.info("Found %d URLs to process (max_concurrency=%d, per_host_limit=%d)",
+                    len(urls), max_concurrency, per_host_limit)
 
-        for i, url in enumerate(urls, 1):
-            logger.info("Fetching feed %d/%d from %s", i, len(urls), url)
+        session = create_fetch_session(max_concurrency)
+        throttle = HostThrottle(per_host_limit)
+        feed_cache = FeedCache(cache_file) if cache_file else None
+        results: List[List[Dict[str, str]]] = [[] for _ in urls]
+        latencies: List[Tuple[float, str]] = []
+
+        def fetch_indexed(index: int, url: str) -> None:
+            start = time.perf_counter()
             try:
-                feed = feedparser.parse(url)
-                
-                # Check if feed parsing was successful
-                if feed.bozo:
-                    logger.warning("Feed %s has parsing warnings: %s", url, feed.bozo_exception)
-                
-                if not feed.entries:
-                    logger.warning("No entries found in feed: %s", url)
-                    continue
-                
-                # Extract articles with better error handling
-                feed_articles = []
-                for entry in feed.entries:
-                    title = getattr(entry, 'title', '')
-                    description = getattr(entry, 'description', '') or getattr(entry, 'summary', '')
-                    link = getattr(entry, 'link', '')
-                    
-                    # Skip entries with missing critical data
-                    if not title and not description:
-                        logger.warning("Skipping entry with no title or description from %s", url)
-                        continue
-                    
-                    # Use fallback values for missing data
-                    article = {
-                        'title': title or 'No Title',
-                        'content': description or 'No Content',
-                        'link': link or url
-                    }
-                    feed_articles.append(article)
-                
-                articles.extend(feed_articles)
-                logger.info("Successfully fetched %d articles from %s", len(feed_articles), url)
-                
+                results[index] = fetch_feed(url, session, throttle, timeout, feed_cache)
+                elapsed = time.perf_counter() - start
+                logger.info("Fetched feed %d/%d from %s: %d articles in %.2fs",
+                            index + 1, len(urls), url, len(results[index]), elapsed)
             except Exception as e:
+                elapsed = time.perf_counter() - start
                 logger.error("Failed to fetch feed from %s: %s", url, e)
-                continue
+            latencies.append((elapsed, url))
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            list(executor.map(fetch_indexed, range(len(urls)), urls))
+        session.close()
+
+        if feed_cache:
+            feed_cache.prune(urls)
+            feed_cache.save()
+
+        for feed_articles in results:
+            articles.extend(feed_articles)
+
+        if latencies:
+            slowest = sorted(latencies, reverse=True)[:5]
+            logger.info("Feed latency: avg %.2fs, max %.2fs",
+                        sum(elapsed for elapsed, _ in latencies) / len(latencies), slowest[0][0])
+            for elapsed, url in slowest:
+                logger.debug("Slow feed: %s took %.2fs", url, elapsed)
 
         logger.info("Total articles fetched and parsed: %d", len(articles))
-        
+
         if len(articles) == 0:
             logger.error("CRITICAL: No articles were fetched from any feeds! This will cause 'No Title' issues.")
             logger.error("Please check your RSS feed URLs using: python tools/rss_debug.py %s", file_path)
-            
+
     except FileNotFoundError as e:
         logger.error("File not found: %s", e)
     except Exception as e:
@@ -146,43 +271,143 @@ def fetch_feeds_from_file(file_path: str) -> List[Dict[str, str]]:
     return articles
 
 
-def detect_language(text: str) -> str:
+def detect_language(text: str, config: Optional[Dict[str, Any]] = None) -> str:
     """Detect the language of a given text."""
-    try:
-        return detect(text)
-    except Exception as e:
-        logger.warning("Language detection failed: %s", e)
-        return 'unknown'
+    config = config or {}
+    return language_detection.detect_language(
+        text,
+        short_text_chars=int(config.get('short_text_chars', 60)),
+        languages=tuple(config.get('languages', language_detection.STOPWORD_LANGUAGES))
+    )
+
+
+class TextPreprocessor:
+    """Reusable preprocessing pipeline for a single language.
+
+    NLP resources, compiled patterns and stopword sets are built once, and the
+    lemmatize/stem/stopword steps are memoised per token, so preprocessing an
+    article is mostly cache lookups.
+    """
+
+    HTML_PATTERN = re.compile(r"<[^<]+?>")
+    PUNCTUATION_PATTERN = re.compile(r'[^\w\s]')
+
+    def __init__(self, language: str, config: Dict[str, Any], cache_size: int = 100000):
+        self.language = language
+        self.remove_html = config.get('remove_html', True)
+        self.lowercase = config.get('lowercase', True)
+        self.remove_punctuation = config.get('remove_punctuation', True)
+        self.lemmatizer = WordNetLemmatizer() if config.get('lemmatization', True) else None
+        # Detected ISO 639-1 codes are mapped to the NLTK stemmer and stopword names
+        nltk_language = language_detection.STOPWORD_LANGUAGES.get(language, language)
+        self.stemmer = SnowballStemmer(
+            nltk_language if nltk_language in SnowballStemmer.languages else 'english'
+        ) if config.get('use_stemming', False) else None
+        self.stop_words = frozenset(
+            stopwords.words(nltk_language if nltk_language in stopwords.fileids() else 'english')
+        )
+        self.additional_stopwords = frozenset(config.get('additional_stopwords', []))
+        self.normalize_token = lru_cache(maxsize=cache_size)(self._normalize_token)
+
+    def _normalize_token(self, token: str) -> str:
+        """Lemmatize and stem a token, returning an empty string for stopwords."""
+        if self.lemmatizer:
+            token = self.lemmatizer.lemmatize(token)
+        if self.stemmer:
+            token = self.stemmer.stem(token)
+        if token in self.stop_words or token in self.additional_stopwords:
+            return ''
+        return token
+
+    def __call__(self, text: str) -> str:
+        """Preprocess a text and return the space-joined tokens."""
+        if self.remove_html:
+            text = self.HTML_PATTERN.sub("", text)  # Remove HTML tags
+        if self.lowercase:
+            text = text.lower()
+        if self.remove_punctuation:
+            text = self.PUNCTUATION_PATTERN.sub('', text)
+
+        normalize_token = self.normalize_token
+        return " ".join(token for token in map(normalize_token, text.split()) if token)
+
+
+_text_preprocessors: Dict[Tuple[str, str], TextPreprocessor] = {}
+
+
+def get_text_preprocessor(language: str, config: Dict[str, Any]) -> TextPreprocessor:
+    """Return the shared TextPreprocessor for a language and preprocessing configuration."""
+    key = (language, json.dumps(config, sort_keys=True, default=str))
+    if key not in _text_preprocessors:
+        _text_preprocessors[key] = TextPreprocessor(language, config)
+    return _text_preprocessors[key]
 
 
 def preprocess_text(text: str, language: str, config: Dict[str, Any]) -> str:
     """Preprocess the text based on the configuration settings and language."""
-    lemmatizer = WordNetLemmatizer()
-    stemmer = SnowballStemmer(language if language in SnowballStemmer.languages else 'english')
-
-    if config.get('remove_html', True):
-        text = re.sub(r"<[^<]+?>", "", text)  # Remove HTML tags
-    if config.get('lowercase', True):
-        text = text.lower()
-    if config.get('remove_punctuation', True):
-        text = re.sub(r'[^\w\s]', '', text)
+    return get_text_preprocessor(language, config)(text)
+
+
+def _prepare_chunk(items: List[Tuple[str, Optional[str]]], config: Dict[str, Any],
+                   detection_config: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Detect the language of (unless already known) and preprocess a chunk of texts."""
+    results = []
+    # Preprocessors are resolved once per language, not per text
+    preprocessors: Dict[str, TextPreprocessor] = {}
+    for text, language in items:
+        language = language or detect_language(text, detection_config)
+        if language not in preprocessors:
+            preprocessors[language] = get_text_preprocessor(language, config)
+        results.append((language, preprocessors[language](text)))
+    return results
+
+
+def prepare_texts(texts: List[str], config: Dict[str, Any],
+                  detection_config: Optional[Dict[str, Any]] = None) -> Tuple[List[str], List[str]]:
+    """Detect languages and preprocess texts, fanning out over a process pool.
+
+    With ``preprocessing.workers`` above 1 the texts are split into chunks of
+    ``preprocessing.chunk_size`` and processed in parallel; results keep the
+    input order either way. Languages found in the
+    ``language_detection.cache_file`` cache are not detected again.
+    """
+    detection_config = detection_config or {}
+    workers = int(config.get('workers', 1) or 1)
+    chunk_size = max(1, int(config.get('chunk_size', 200)))
+
+    cache_file = detection_config.get('cache_file')
+    language_cache = LanguageCache(cache_file) if cache_file else None
+    hashes = [language_detection.text_hash(text) for text in texts]
+    known_languages = language_cache.get_many(hashes) if language_cache else [None] * len(texts)
+    if language_cache:
+        logger.info("Language cache hits: %d/%d", sum(lang is not None for lang in known_languages), len(texts))
+    items = list(zip(texts, known_languages))
+
+    if workers <= 1 or len(items) <= chunk_size:
+        results = _prepare_chunk(items, config, detection_config)
+    else:
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        logger.info("Preprocessing %d texts in %d chunks across %d worker processes", len(texts), len(chunks), workers)
+        results = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk_results in executor.map(_prepare_chunk, chunks, [config] * len(chunks),
+                                              [detection_config] * len(chunks)):
+                results.extend(chunk_results)
 
-    tokens = text.split()
-    if config.get('lemmatization', True):
-        tokens = [lemmatizer.lemmatize(word) for word in tokens]
-    if config.get('use_stemming', False):
-        tokens = [stemmer.stem(word) for word in tokens]
+    languages = [language for language, _ in results]
+    preprocessed_texts = [text for _, text in results]
 
-    stop_words = set(stopwords.words(language if language in stopwords.fileids() else 'english'))
-    additional_stopwords = set(config.get('additional_stopwords', []))
-    tokens = [word for word in tokens if word not in stop_words and word not in additional_stopwords]
+    if language_cache:
+        language_cache.put_many(dict(zip(hashes, languages)))
+        language_cache.close()
+    return languages, preprocessed_texts
 
-    preprocessed_text = " ".join(tokens)
-    return preprocessed_text
 
+def vectorize_texts(texts: List[str], config: Dict[str, Any], return_vectorizer: bool = False) -> Any:
+    """Vectorize texts based on the specified method in the configuration.
 
-def vectorize_texts(texts: List[str], config: Dict[str, Any]) -> Any:
-    """Vectorize texts based on the specified method in the configuration."""
+    With return_vectorizer set, a (vectors, vectorizer) tuple is returned.
+    """
     vectorizer_params = {
         'ngram_range': tuple(config.get('ngram_range', [1, 2])),
         'max_df': config.get('max_df', 0.85),
@@ -201,9 +426,22 @@ def vectorize_texts(texts: List[str], config: Dict[str, Any]) -> Any:
         raise ValueError(f"Unsupported vectorization method: {method}")
 
     vectors = vectorizer.fit_transform(texts)
+    if return_vectorizer:
+        return vectors, vectorizer
     return vectors
 
 
+def group_centroid_terms(vectors: Any, indices: List[int], feature_names: Optional[np.ndarray],
+                         top_terms: int = 100) -> Dict[str, float]:
+    """Return the heaviest terms of the mean L2-normalised vector of the given rows."""
+    centroid = np.asarray(normalize(sparse.csr_matrix(vectors)[indices]).mean(axis=0)).ravel()
+    top = np.argsort(centroid)[::-1][:top_terms]
+    return {
+        (str(feature_names[i]) if feature_names is not None else str(i)): float(centroid[i])
+        for i in top if centroid[i] > 0
+    }
+
+
 def cluster_texts(vectors: Any, config: Dict[str, Any]) -> np.ndarray:
     """Cluster texts using the specified clustering method in the configuration."""
     method = config.get('method', 'dbscan').lower()
@@ -244,13 +482,118 @@ def aggregate_similar_articles(articles: List[Dict[str, str]], similarity_matrix
     )
     labels = clustering.fit_predict(1 - similarity_matrix)
 
+    return [
+        ([articles[i] for i in members], average_similarity)
+        for members, average_similarity in score_groups(similarity_matrix, labels)
+    ]
+
+
+def score_groups(similarity_matrix: np.ndarray, labels: np.ndarray) -> List[Tuple[np.ndarray, float]]:
+    """Return (member indices, average pairwise similarity) for each label, in label order.
+
+    Indices are sorted by label once, so each group's score is the mean of its
+    off-diagonal submatrix instead of a scan over all n² pairs per label.
+    """
+    labels = np.asarray(labels)
+    if labels.size == 0:
+        return []
+
+    order = np.argsort(labels, kind='stable')
+    boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+
+    scores = []
+    for members in np.split(order, boundaries):
+        size = len(members)
+        if size > 1:
+            block = similarity_matrix[np.ix_(members, members)]
+            average_similarity = (block.sum() - np.trace(block)) / (size * (size - 1))
+        else:
+            average_similarity = 0
+        scores.append((members, average_similarity))
+    return scores
+
+
+def compute_similarity_graph(vectors: Any, min_similarity: float, top_k: Optional[int] = None,
+                             chunk_size: int = 1024) -> sparse.csr_matrix:
+    """Build a sparse graph linking articles whose cosine similarity reaches min_similarity.
+
+    Rows are L2-normalised and multiplied against the corpus one chunk at a time,
+    so memory grows with the number of neighbours instead of n². With top_k set,
+    only the k most similar neighbours of each article are kept.
+    """
+    normalized = normalize(sparse.csr_matrix(vectors, dtype=np.float64), norm='l2')
+    n_samples = normalized.shape[0]
+    transposed = normalized.T.tocsc()
+    rows, cols, data = [], [], []
+
+    for start in range(0, n_samples, chunk_size):
+        block = (normalized[start:start + chunk_size] @ transposed).tocoo()
+        # Self-similarity carries no grouping information
+        keep = (block.data >= min_similarity) & (block.row + start != block.col)
+        block_rows, block_cols, block_data = block.row[keep], block.col[keep], block.data[keep]
+
+        if top_k:
+            order = np.lexsort((-block_data, block_rows))
+            sorted_rows = block_rows[order]
+            rank = np.arange(len(order)) - np.searchsorted(sorted_rows, sorted_rows, side='left')
+            order = order[rank < top_k]
+            block_rows, block_cols, block_data = block_rows[order], block_cols[order], block_data[order]
+
+        rows.append(block_rows + start)
+        cols.append(block_cols)
+        data.append(block_data)
+
+    graph = sparse.coo_matrix(
+        (np.concatenate(data or [[]]), (np.concatenate(rows or [[]]), np.concatenate(cols or [[]]))),
+        shape=(n_samples, n_samples)
+    ).tocsr()
+    # top_k pruning is one-sided; keep an edge if either endpoint retained it
+    return graph.maximum(graph.T).tocsr()
+
+
+def group_articles_by_graph(articles: List[Dict[str, str]], vectors: Any, threshold: float,
+                            graph_config: Optional[Dict[str, Any]] = None) -> List[Tuple[List[Dict[str, str]], float]]:
+    """Group articles like aggregate_similar_articles without materialising the n×n matrix.
+
+    Average-linkage clusters never span two connected components of the
+    neighbour graph (every merge needs at least one pair closer than the
+    threshold), so clustering each component on its own dense block gives the
+    same groups as clustering the full similarity matrix.
+    """
+    graph_config = graph_config or {}
+    graph = compute_similarity_graph(
+        vectors,
+        min_similarity=1 - threshold,
+        top_k=graph_config.get('top_k'),
+        chunk_size=int(graph_config.get('chunk_size', 1024))
+    )
+    logger.info("Similarity graph: %d articles, %d edges", graph.shape[0], graph.nnz // 2)
+
+    n_components, component_labels = connected_components(graph, directed=False)
+    order = np.argsort(component_labels, kind='stable')
+    boundaries = np.flatnonzero(np.diff(component_labels[order])) + 1
+    vectors = sparse.csr_matrix(vectors)
+
     grouped_articles_with_scores = []
-    for label in set(labels):
-        group = [articles[i] for i in range(len(articles)) if labels[i] == label]
-        group_similarities = [similarity_matrix[i][j] for i in range(len(articles)) for j in range(len(articles)) if labels[i] == label and labels[j] == label and i != j]
-        average_similarity = np.mean(group_similarities) if group_similarities else 0
-        grouped_articles_with_scores.append((group, average_similarity))
+    for members in np.split(order, boundaries):
+        if len(members) == 1:
+            grouped_articles_with_scores.append(([articles[members[0]]], 0))
+            continue
+        if len(members) > 5000:
+            logger.warning("Large similarity component with %d articles; consider setting similarity_graph.top_k",
+                           len(members))
+        similarity_block = cosine_similarity(vectors[members])
+        clustering = AgglomerativeClustering(
+            metric='precomputed',
+            linkage='average',
+            distance_threshold=threshold,
+            n_clusters=None
+        )
+        labels = clustering.fit_predict(1 - similarity_block)
+        for local, average_similarity in score_groups(similarity_block, labels):
+            grouped_articles_with_scores.append(([articles[i] for i in members[local]], average_similarity))
 
+    logger.info("Formed %d groups from %d connected components", len(grouped_articles_with_scores), n_components)
     return grouped_articles_with_scores
 
 
@@ -259,7 +602,7 @@ def save_grouped_articles(grouped_articles_with_scores: List[Tuple[List[Dict[str
     ensure_directory_exists(output_dir)
     saved_files_count = 0
     for i, (group, avg_similarity) in enumerate(grouped_articles_with_scores):
-        if len(group) > 1:  # Only save groups with more than one article
+        if source_count(group) > 1:  # Only save groups with more than one source article
             filename = f"group_{i}.json"
             file_path = os.path.join(output_dir, filename)
             try:
@@ -272,6 +615,62 @@ def save_grouped_articles(grouped_articles_with_scores: List[Tuple[List[Dict[str
     return saved_files_count
 
 
+def save_story_updates(grouped_articles_with_scores: List[Tuple[List[Dict[str, str]], float]],
+                       vectors: Any, feature_names: Optional[np.ndarray], articles: List[Dict[str, str]],
+                       story_store: StoryStore, output_dir: str) -> List[Dict[str, str]]:
+    """Attach this run's groups to persistent stories and write the stories that changed.
+
+    Each changed story is written to ``<story_id>.json`` with all of its
+    members, so its file only changes when its membership does. Returns the
+    articles that ended up in a story.
+    """
+    ensure_directory_exists(output_dir)
+    positions = {id(article): index for index, article in enumerate(articles)}
+    changed = []
+    for group, avg_similarity in grouped_articles_with_scores:
+        centroid = group_centroid_terms(vectors, [positions[id(article)] for article in group],
+                                        feature_names, story_store.top_terms)
+        story_id = story_store.assign(group, centroid, avg_similarity)
+        if story_id and story_id not in changed:
+            changed.append(story_id)
+
+    assigned_articles = []
+    for story_id in changed:
+        story_articles = story_store.articles(story_id)
+        assigned_articles.extend(story_articles)
+        average_similarity = story_store.stories[story_id]['average_similarity']
+        file_path = os.path.join(output_dir, f"{story_id}.json")
+        try:
+            with open(file_path, 'w', encoding='utf-8') as file:
+                json.dump({'story_id': story_id, 'articles': story_articles, 'average_similarity': average_similarity},
+                          file, ensure_ascii=False, indent=4)
+            logger.info("Story %s: Saved %d articles to %s, Avg Similarity: %.2f",
+                        story_id, len(story_articles), file_path, average_similarity)
+        except Exception as e:
+            logger.error("Error saving story %s to JSON: %s", story_id, e)
+
+    for story_id in story_store.expired:
+        expired_path = os.path.join(output_dir, f"{story_id}.json")
+        if os.path.exists(expired_path):
+            os.remove(expired_path)
+            logger.info("Removed expired story %s", story_id)
+
+    story_store.save()
+    logger.info("Stories updated this run: %d (active: %d)", len(changed), len(story_store.stories))
+    return assigned_articles
+
+
+def filter_stale_groups(grouped_articles_with_scores: List[Tuple[List[Dict[str, str]], float]],
+                        stale_ids: set) -> List[Tuple[List[Dict[str, str]], float]]:
+    """Drop groups whose articles were all grouped in a previous run."""
+    fresh_groups = [
+        (group, score) for group, score in grouped_articles_with_scores
+        if not all(id(article) in stale_ids for article in group)
+    ]
+    logger.info("Skipped %d stale groups", len(grouped_articles_with_scores) - len(fresh_groups))
+    return fresh_groups
+
+
 def deduplicate_articles(articles: List[Dict[str, str]]) -> List[Dict[str, str]]:
     """Remove duplicate articles based on content and link."""
     seen = set()
@@ -297,11 +696,20 @@ def main(config: Dict[str, Any]) -> None:
 
     try:
         logger.info("Fetching and parsing RSS feeds...")
-        articles = fetch_feeds_from_file(input_feeds_path)
+        articles = fetch_feeds_from_file(input_feeds_path, config.get('fetching', {}))
         logger.info("Total articles fetched and parsed: %d", len(articles))
 
         logger.info("Deduplicating articles...")
         articles = deduplicate_articles(articles)
+
+        near_duplicate_config = config.get('near_duplicates', {})
+        if near_duplicate_config.get('enabled', False):
+            logger.info("Collapsing near-duplicate articles...")
+            articles = collapse_near_duplicates(
+                articles,
+                max_distance=near_duplicate_config.get('max_hamming_distance', 6),
+                shingle_size=near_duplicate_config.get('shingle_size', 2)
+            )
     except FileNotFoundError as e:
         logger.error("File not found: %s", e)
         return
@@ -309,25 +717,68 @@ def main(config: Dict[str, Any]) -> None:
         logger.error("Error fetching or parsing RSS feeds: %s", e)
         return
 
-    logger.info("Preprocessing texts...")
-    languages = [detect_language(f"{article['title']} {article['content']}") for article in articles]
-    preprocessed_texts = [
-        preprocess_text(f"{article['title']} {article['content']}", lang, config.get('preprocessing', {}))
-        for article, lang in zip(articles, languages)
-    ]
-
-    logger.info("Vectorizing texts...")
-    vectors = vectorize_texts(preprocessed_texts, config.get('vectorization', {}))
-
-    logger.info("Computing similarity matrix...")
-    similarity_matrix = cosine_similarity(vectors)
+    seen_config = config.get('seen_store', {})
+    seen_store = None
+    # The seen-article store is closed on every exit path, errors included
+    try:
+        stale_ids = set()
+        if seen_config.get('enabled', False):
+            seen_store = SeenArticleStore(seen_config.get('db_file', 'cache/seen_articles.db'),
+                                          seen_config.get('retention_days', 30))
+            new_articles, seen_articles = seen_store.split(articles)
+            logger.info("Seen-article store: %d new, %d already processed", len(new_articles), len(seen_articles))
+            seen_store.mark_seen(seen_articles)  # Refresh retention for items still present in the feeds
+            if seen_config.get('mode', 'skip') == 'mark':
+                # Keep seen articles as clustering context but never emit groups made only of them
+                stale_ids = {id(article) for article in seen_articles}
+            else:
+                articles = new_articles
+
+        if not articles:
+            logger.info("No new articles to process.")
+            return
+
+        logger.info("Preprocessing texts...")
+        _, preprocessed_texts = prepare_texts(
+            [f"{article['title']} {article['content']}" for article in articles],
+            config.get('preprocessing', {}),
+            config.get('language_detection', {})
+        )
 
-    logger.info("Clustering texts...")
-    grouped_articles_with_scores = aggregate_similar_articles(articles, similarity_matrix, config.get('similarity_threshold', 0.66))
+        logger.info("Vectorizing texts...")
+        vectors, vectorizer = vectorize_texts(preprocessed_texts, config.get('vectorization', {}), return_vectorizer=True)
 
-    logger.info("Saving grouped articles to JSON files...")
-    saved_files_count = save_grouped_articles(grouped_articles_with_scores, output_directory)
-    logger.info("Total number of JSON files generated: %d", saved_files_count)
+        logger.info("Clustering texts on the sparse similarity graph...")
+        grouped_articles_with_scores = group_articles_by_graph(
+            articles, vectors, config.get('similarity_threshold', 0.66), config.get('similarity_graph', {})
+        )
+        if stale_ids:
+            grouped_articles_with_scores = filter_stale_groups(grouped_articles_with_scores, stale_ids)
+
+        story_config = config.get('incremental_clustering', {})
+        if story_config.get('enabled', False):
+            logger.info("Assigning groups to stories...")
+            story_store = StoryStore(
+                story_config.get('state_file', 'cache/stories.json'),
+                match_threshold=story_config.get('match_threshold', 0.5),
+                max_age_days=story_config.get('max_age_days', 3),
+                top_terms=story_config.get('top_terms', 100)
+            )
+            feature_names = vectorizer.get_feature_names_out() if hasattr(vectorizer, 'get_feature_names_out') else None
+            emitted_articles = save_story_updates(grouped_articles_with_scores, vectors, feature_names,
+                                                  articles, story_store, output_directory)
+        else:
+            logger.info("Saving grouped articles to JSON files...")
+            saved_files_count = save_grouped_articles(grouped_articles_with_scores, output_directory)
+            logger.info("Total number of JSON files generated: %d", saved_files_count)
+            emitted_articles = [article for group, _ in grouped_articles_with_scores if source_count(group) > 1
+                                for article in group]
+
+        if seen_store:
+            seen_store.mark_seen(emitted_articles)
+    finally:
+        if seen_store:
+            seen_store.close()
 
     elapsed_time = time.time() - start_time
     logger.info("RSS feed processing complete in %.2f seconds", elapsed_time)
@@ -369,6 +820,9 @@ if __name__ == "__main__":
     parser.add_argument(
         '--input_feeds_path', type=str, help='Path to the input file containing RSS feed URLs.'
     )
+    parser.add_argument(
+        '--max_concurrency', type=int, help='Maximum number of feeds downloaded in parallel.'
+    )
     args = parser.parse_args()
 
     # Load default configuration from the YAML file
@@ -383,7 +837,8 @@ if __name__ == "__main__":
         'min_samples': args.min_samples,
         'eps': args.eps,
         'output': {'output_dir': args.output_dir},
-        'input_feeds_path': args.input_feeds_path
+        'input_feeds_path': args.input_feeds_path,
+        'fetching': {'max_concurrency': args.max_concurrency}
     }
 
     # Merge all configurations with priority: CLI > ENV > YAML
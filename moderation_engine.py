@@ -0,0 +1,97 @@
+"""
+Single-pass content moderation for UglyFeed.
+
+The moderated words of a list are compiled into one case-insensitive regular
+expression shaped as a trie (words sharing a prefix share a branch), so a text
+is scanned once however long the list is. Engines are cached per words file
+and rebuilt only when the file's modification time changes, so any stage can
+call get_moderation_engine() cheaply.
+"""
+
+import os
+import re
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+
+def _trie_pattern(node: Dict[str, dict]) -> Optional[str]:
+    """Build a regex fragment matching every word below a trie node; None if the node is a leaf."""
+    is_word_end = '' in node
+    branches = []
+    single_chars = []
+    for char in sorted(key for key in node if key):
+        child = _trie_pattern(node[char])
+        if child is None:
+            single_chars.append(re.escape(char))
+        else:
+            branches.append(re.escape(char) + child)
+    if single_chars:
+        branches.append(single_chars[0] if len(single_chars) == 1 else '[' + ''.join(single_chars) + ']')
+    if not branches:
+        return None
+
+    pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if is_word_end:
+        # Greedy, so the longest word is tried first and shorter ones on backtracking
+        pattern = '(?:' + pattern + ')?' if len(branches) > 1 or len(pattern) > 1 else pattern + '?'
+    return pattern
+
+
+def compile_words(words: Iterable[str]) -> Optional['re.Pattern']:
+    """Compile moderated words into one case-insensitive, word-bounded regex."""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        word = word.strip().lower()
+        if not word:
+            continue
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    pattern = _trie_pattern(trie)
+    if pattern is None:
+        return None
+    return re.compile(r'\b' + pattern + r'\b', re.IGNORECASE)
+
+
+class ModerationEngine:
+    """Masks moderated words in a single pass over the text."""
+
+    def __init__(self, words: Iterable[str]):
+        self.pattern = compile_words(words)
+
+    def censor(self, text: str) -> str:
+        """Replace every moderated word in the text with asterisks of the same length."""
+        if self.pattern is None or not text:
+            return text
+        return self.pattern.sub(lambda match: '*' * len(match.group()), text)
+
+    def contains(self, text: str) -> bool:
+        """Return True if the text contains a moderated word."""
+        return bool(self.pattern and text and self.pattern.search(text))
+
+
+_engines: Dict[str, Tuple[float, ModerationEngine]] = {}
+_engines_lock = threading.Lock()
+
+
+def get_moderation_engine(words_file: str) -> ModerationEngine:
+    """Return the engine for a words file, recompiling it only when the file changed."""
+    try:
+        mtime = os.path.getmtime(words_file)
+    except OSError:
+        logger.error("Moderated words file '%s' not found.", words_file)
+        return ModerationEngine([])
+
+    with _engines_lock:
+        cached = _engines.get(words_file)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(words_file, 'r', encoding='utf-8') as file:
+            engine = ModerationEngine(file)
+        _engines[words_file] = (mtime, engine)
+        return engine
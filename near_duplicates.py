@@ -0,0 +1,119 @@
+"""
+Near-duplicate detection for syndicated articles.
+
+Each article gets a 64-bit SimHash over word shingles of its title and content.
+Fingerprints are split into bands so that, by the pigeonhole principle, any two
+fingerprints within the allowed Hamming distance share at least one identical
+band; only those candidate pairs are compared. Near-identical articles are
+collapsed into the first one seen, which keeps the links of the others.
+"""
+
+import hashlib
+import re
+from collections import defaultdict
+from typing import Dict, List
+
+import numpy as np
+
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+MARKUP_PATTERN = re.compile(r"<[^<]+?>")
+FINGERPRINT_BITS = 64
+BIT_POSITIONS = np.arange(FINGERPRINT_BITS, dtype=np.uint64)
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """Compute the 64-bit SimHash of a text over word shingles."""
+    tokens = TOKEN_PATTERN.findall(MARKUP_PATTERN.sub(" ", text).lower())
+    if len(tokens) > shingle_size:
+        shingles = [" ".join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)]
+    else:
+        shingles = tokens
+    if not shingles:
+        return 0
+
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+         for shingle in shingles],
+        dtype=np.uint64
+    )
+    bits = (hashes[:, None] >> BIT_POSITIONS) & np.uint64(1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+    return int(np.sum(np.left_shift(np.uint64(1), BIT_POSITIONS[votes > 0]), dtype=np.uint64))
+
+
+def find_near_duplicate_clusters(fingerprints: List[int], max_distance: int = 3) -> List[int]:
+    """Return, for every fingerprint, the index of the first fingerprint it is a near-duplicate of."""
+    parents = list(range(len(fingerprints)))
+
+    def find(index: int) -> int:
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    def union(first: int, other: int) -> None:
+        root_first, root_other = find(first), find(other)
+        if root_first != root_other:
+            # The earliest article stays the representative
+            parents[max(root_first, root_other)] = min(root_first, root_other)
+
+    bands = max_distance + 1
+    band_width = FINGERPRINT_BITS // bands
+    band_mask = (1 << band_width) - 1
+
+    for band in range(bands):
+        buckets: Dict[int, List[int]] = defaultdict(list)
+        shift = band * band_width
+        for index, fingerprint in enumerate(fingerprints):
+            buckets[(fingerprint >> shift) & band_mask].append(index)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            # Identical fingerprints are merged directly; distinct ones are compared pairwise
+            distinct: Dict[int, int] = {}
+            for index in members:
+                if fingerprints[index] in distinct:
+                    union(distinct[fingerprints[index]], index)
+                else:
+                    distinct[fingerprints[index]] = index
+            candidates = list(distinct.items())
+            for position, (fingerprint, index) in enumerate(candidates):
+                for other_fingerprint, other in candidates[position + 1:]:
+                    if bin(fingerprint ^ other_fingerprint).count('1') <= max_distance:
+                        union(index, other)
+
+    return [find(index) for index in range(len(fingerprints))]
+
+
+def source_count(articles: List[Dict[str, str]]) -> int:
+    """Number of source articles behind a list of articles, counting collapsed near-duplicates."""
+    return sum(1 + len(article.get('duplicate_links', [])) for article in articles)
+
+
+def collapse_near_duplicates(articles: List[Dict[str, str]], max_distance: int = 3,
+                             shingle_size: int = 3) -> List[Dict[str, str]]:
+    """Collapse near-identical articles into one representative that keeps the other links.
+
+    The links of collapsed copies are stored in the representative's
+    ``duplicate_links`` list.
+    """
+    fingerprints = [simhash(f"{article['title']} {article['content']}", shingle_size) for article in articles]
+    representatives = find_near_duplicate_clusters(fingerprints, max_distance)
+
+    collapsed = []
+    for index, article in enumerate(articles):
+        representative = representatives[index]
+        if representative == index:
+            collapsed.append(article)
+            continue
+        kept = articles[representative]
+        duplicate_links = kept.setdefault('duplicate_links', [])
+        if article['link'] != kept['link'] and article['link'] not in duplicate_links:
+            duplicate_links.append(article['link'])
+
+    logger.info("Collapsed %d near-duplicate articles; %d remain", len(articles) - len(collapsed), len(collapsed))
+    return collapsed
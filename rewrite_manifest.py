@@ -0,0 +1,87 @@
+"""
+Resume manifest for llm_processor.
+
+Records, for every input group file, the hash of its content, a hash of the
+settings it was rewritten with (provider, model, prompt and generation
+parameters) and the output file it produced. The manifest is written after
+every finished file, so an interrupted run resumes where it stopped and files
+that are already up to date are skipped.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+
+def file_hash(path: str) -> str:
+    """Hash the content of a file."""
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def settings_hash(*settings: Any) -> str:
+    """Hash the settings that determine a rewrite."""
+    payload = json.dumps(settings, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RewriteManifest:
+    """Thread-safe, JSON-backed record of rewritten input files."""
+
+    def __init__(self, manifest_path: str):
+        self.manifest_path = Path(manifest_path)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """Load the manifest from disk, starting empty if the file is missing or corrupt."""
+        if not self.manifest_path.exists():
+            return
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as file:
+                self._entries = json.load(file)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning("Ignoring unreadable rewrite manifest %s: %s", self.manifest_path, e)
+            self._entries = {}
+
+    def is_up_to_date(self, input_name: str, input_hash: str, settings_digest: str) -> bool:
+        """Return True if the input was rewritten with the same content and settings and the output still exists."""
+        with self._lock:
+            entry = self._entries.get(input_name)
+        return bool(
+            entry
+            and entry['input_hash'] == input_hash
+            and entry['settings_hash'] == settings_digest
+            and Path(entry['output']).exists()
+        )
+
+    def record(self, input_name: str, input_hash: str, settings_digest: str, output_path: str) -> None:
+        """Record a finished rewrite and save the manifest immediately."""
+        with self._lock:
+            self._entries[input_name] = {
+                'input_hash': input_hash,
+                'settings_hash': settings_digest,
+                'output': str(output_path),
+                'completed_at': time.time()
+            }
+            self._save()
+
+    def _save(self) -> None:
+        """Atomically write the manifest to disk; the caller holds the lock."""
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(self._entries, file, ensure_ascii=False)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            logger.error("Error saving rewrite manifest to %s: %s", self.manifest_path, e)
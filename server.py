@@ -1,5 +1,8 @@
 """
 This script starts an HTTP server to serve XML files with the correct content type and cache headers.
+
+The RSS, Atom and JSON Feed outputs are served from their precompressed .br
+or .gz siblings when the client accepts that encoding.
 """
 
 from http.server import HTTPServer, SimpleHTTPRequestHandler
@@ -8,6 +11,7 @@ import shutil
 from pathlib import Path
 import os
 from logging_setup import setup_logging, get_logger
+from utils import list_feed_outputs
 
 # Initialize logging
 logger = setup_logging()
@@ -19,18 +23,43 @@ uglyfeed_file = UGLYFEED_FILE  # Alias for UGLYFEED_FILE
 UGLYFEEDS_DIR = Path("uglyfeeds")
 STATIC_DIR = Path(".streamlit") / "static" / "uglyfeeds"
 
+# Content type of each feed output, by extension
+FEED_CONTENT_TYPES = {
+    ".xml": "application/xml",
+    ".atom": "application/atom+xml",
+    ".json": "application/feed+json",
+}
+# Precompressed sibling suffixes, in order of preference
+PRECOMPRESSED_ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+def accepted_encodings(header):
+    """Return the content codings accepted by an Accept-Encoding header."""
+    accepted = set()
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
 class CustomXMLHandler(SimpleHTTPRequestHandler):
     """Custom HTTP handler to serve XML files with correct content type and cache headers."""
 
     def do_GET(self):
         """Handle GET requests."""
-        if self.path.endswith(".xml"):
+        if self.path.endswith(tuple(FEED_CONTENT_TYPES)):
             self._serve_xml_file()
         else:
             super().do_GET()
 
     def _serve_xml_file(self):
-        """Serve an XML file with appropriate headers."""
+        """Serve a feed file with appropriate headers, precompressed if the client accepts it."""
         # Resolve to absolute path and guard against path traversal
         requested = (STATIC_DIR / self.path.lstrip('/')).resolve()
         static_root = STATIC_DIR.resolve()
@@ -44,14 +73,26 @@ class CustomXMLHandler(SimpleHTTPRequestHandler):
             return
 
         if requested.exists() and requested.is_file():
+            served, content_encoding = requested, None
+            accepted = accepted_encodings(self.headers.get("Accept-Encoding"))
+            for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+                sibling = requested.with_name(requested.name + suffix)
+                if (encoding in accepted or "*" in accepted) and sibling.is_file():
+                    served, content_encoding = sibling, encoding
+                    break
+
+            with open(served, 'rb') as file:
+                body = file.read()
             self.send_response(200)
-            self.send_header("Content-Type", "application/xml")
+            self.send_header("Content-Type", FEED_CONTENT_TYPES[requested.suffix])
+            if content_encoding:
+                self.send_header("Content-Encoding", content_encoding)
+            self.send_header("Vary", "Accept-Encoding")
+            self.send_header("Content-Length", str(len(body)))
             self.send_header("Cache-Control", "no-store, no-cache, must-revalidate, proxy-revalidate, max-age=0")
             self.end_headers()
-
-            with open(requested, 'rb') as file:
-                self.wfile.write(file.read())
-            server_logger.info("Served XML file: %s", requested)
+            self.wfile.write(body)
+            server_logger.info("Served XML file: %s", served)
         else:
             self.send_error(404, "File not found")
             server_logger.warning("XML file not found: %s", requested)
@@ -84,14 +125,21 @@ def toggle_server(start, port, session_state):
             server_logger.info("Server is not running.")
 
 def copy_xml_to_static():
-    """Copy the XML file to the Streamlit static directory if it exists."""
+    """Copy the main and shard feeds, in every format and compression, to the Streamlit static directory."""
     source_file = UGLYFEEDS_DIR / UGLYFEED_FILE
     destination_file = STATIC_DIR / UGLYFEED_FILE
 
     if source_file.exists() and source_file.is_file():
         os.makedirs(STATIC_DIR, exist_ok=True)
-        shutil.copy(source_file, destination_file)
-        server_logger.info("Copied %s to %s.", UGLYFEED_FILE, STATIC_DIR)
+        outputs = list_feed_outputs(UGLYFEEDS_DIR)
+        for output in outputs:
+            shutil.copy(output, STATIC_DIR / output.name)
+        # Never serve a stale variant or a feed shard that is no longer generated
+        current_names = {output.name for output in outputs}
+        for stale in list_feed_outputs(STATIC_DIR):
+            if stale.name not in current_names:
+                stale.unlink()
+        server_logger.info("Copied %d feed files to %s.", len(outputs), STATIC_DIR)
         return destination_file
     else:
         server_logger.warning("Source file %s does not exist in %s.", UGLYFEED_FILE, UGLYFEEDS_DIR)
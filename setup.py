@@ -55,6 +55,10 @@ setup(
         'streamlit',  # No specific version required, latest will be installed
         'schedule',
     ],
+    extras_require={
+        'tokenizer': ['tiktoken'],  # Exact BPE token counts for prompt budgeting in llm_processor.py
+        'brotli': ['brotli'],  # Precompressed .br feed siblings written by json2rss.py (feed_compression)
+    },
     entry_points={
         'console_scripts': [
             'uglypy=uglypy.cli:main',
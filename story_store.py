@@ -0,0 +1,146 @@
+"""
+Incremental story clustering state for UglyFeed.
+
+Keeps the stories formed in previous runs (a term-weight centroid, the member
+articles and a stable story id) so that each run only attaches its groups to an
+existing story or opens a new one. Centroids are stored as term -> weight maps,
+which keeps them comparable even though the vectorizer vocabulary is refitted
+on every run.
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from article_store import article_key
+from logging_setup import get_logger
+from near_duplicates import source_count
+
+logger = get_logger(__name__)
+
+
+def normalize_terms(weights: Dict[str, float], top_terms: int) -> Dict[str, float]:
+    """Keep the heaviest terms of a centroid and rescale it to unit length."""
+    top = sorted(weights.items(), key=lambda item: item[1], reverse=True)[:top_terms]
+    norm = math.sqrt(sum(weight * weight for _, weight in top))
+    if not norm:
+        return {}
+    return {term: weight / norm for term, weight in top}
+
+
+def terms_similarity(left: Dict[str, float], right: Dict[str, float]) -> float:
+    """Cosine similarity of two unit-length term maps."""
+    if len(left) > len(right):
+        left, right = right, left
+    return sum(weight * right.get(term, 0.0) for term, weight in left.items())
+
+
+def article_id(article: Dict[str, str]) -> str:
+    """Stable identifier of an article across runs."""
+    return ':'.join(article_key(article))
+
+
+class StoryStore:
+    """JSON-backed set of stories carried over between runs."""
+
+    def __init__(self, state_path: str, match_threshold: float = 0.5, max_age_days: int = 3,
+                 top_terms: int = 100):
+        self.state_path = Path(state_path)
+        self.match_threshold = match_threshold
+        self.max_age_days = max_age_days
+        self.top_terms = top_terms
+        self.stories: Dict[str, Dict[str, Any]] = {}
+        self.expired: List[str] = []
+        self.load()
+
+    def load(self) -> None:
+        """Load stories from disk and drop the ones that stopped receiving articles."""
+        if self.state_path.exists():
+            try:
+                with open(self.state_path, 'r', encoding='utf-8') as file:
+                    self.stories = json.load(file)
+            except (json.JSONDecodeError, OSError) as e:
+                logger.warning("Ignoring unreadable story state %s: %s", self.state_path, e)
+                self.stories = {}
+
+        cutoff = time.time() - self.max_age_days * 86400
+        self.expired = [story_id for story_id, story in self.stories.items() if story['updated_at'] < cutoff]
+        for story_id in self.expired:
+            del self.stories[story_id]
+        logger.info("Loaded %d active stories (%d expired) from %s",
+                    len(self.stories), len(self.expired), self.state_path)
+
+    def best_match(self, centroid: Dict[str, float]) -> Tuple[Optional[str], float]:
+        """Return the most similar existing story and its similarity.
+
+        The centroid is rescaled to unit length first, like the stored ones.
+        """
+        centroid = normalize_terms(centroid, self.top_terms)
+        best_id, best_score = None, 0.0
+        for story_id, story in self.stories.items():
+            score = terms_similarity(centroid, story['centroid'])
+            if score > best_score:
+                best_id, best_score = story_id, score
+        return best_id, best_score
+
+    def assign(self, articles: List[Dict[str, str]], centroid: Dict[str, float],
+               average_similarity: float) -> Optional[str]:
+        """Attach a group of articles to a story and return its id if the membership changed.
+
+        Groups that match no story open a new one, unless they consist of a
+        single article.
+        """
+        centroid = normalize_terms(centroid, self.top_terms)
+        story_id, score = self.best_match(centroid)
+        now = time.time()
+
+        if story_id is None or score < self.match_threshold:
+            if source_count(articles) < 2:
+                return None
+            story_id = 'story_' + hashlib.sha1(article_id(articles[0]).encode('utf-8')).hexdigest()[:12]
+            self.stories[story_id] = {
+                'centroid': centroid,
+                'members': {},
+                'average_similarity': float(average_similarity),
+                'created_at': now,
+                'updated_at': now
+            }
+
+        story = self.stories[story_id]
+        new_members = {article_id(article): article for article in articles
+                       if article_id(article) not in story['members']}
+        if not new_members:
+            return None
+
+        old_count = len(story['members'])
+        new_count = old_count + len(new_members)
+        merged = {term: weight * old_count for term, weight in story['centroid'].items()}
+        for term, weight in centroid.items():
+            merged[term] = merged.get(term, 0.0) + weight * len(new_members)
+        story['centroid'] = normalize_terms(merged, self.top_terms)
+        if old_count:
+            story['average_similarity'] = float(
+                (story['average_similarity'] * old_count + average_similarity * len(new_members)) / new_count
+            )
+        story['members'].update(new_members)
+        story['updated_at'] = now
+        return story_id
+
+    def articles(self, story_id: str) -> List[Dict[str, str]]:
+        """Return the member articles of a story in insertion order."""
+        return list(self.stories[story_id]['members'].values())
+
+    def save(self) -> None:
+        """Atomically write the story state to disk."""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_name(self.state_path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(self.stories, file, ensure_ascii=False)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.error("Error saving story state to %s: %s", self.state_path, e)
@@ -0,0 +1,122 @@
+"""
+Token counting and prompt budgeting for llm_processor.
+
+Tokens are counted with a tiktoken BPE encoding when the optional tiktoken
+package is installed and its vocabulary can be loaded, and with a
+word/punctuation heuristic otherwise. configure_tokenizer_cache() points
+tiktoken at a local directory so the vocabulary is downloaded only once. Prompts
+that exceed the budget are truncated fairly: every source block gets an equal
+share of the budget, and the share unused by short sources is handed on to
+the longer ones, so no source is dropped entirely.
+"""
+
+import math
+import os
+import re
+from functools import lru_cache
+from typing import List, Optional
+
+from logging_setup import get_logger
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = get_logger(__name__)
+
+# Words, and every other non-space character on its own; URLs and markup split into many pieces
+HEURISTIC_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+# Average characters per BPE token for words; accented and long words split into more tokens
+HEURISTIC_CHARS_PER_TOKEN = 4
+DEFAULT_ENCODING = "cl100k_base"
+DEFAULT_CACHE_DIR = os.path.join("cache", "tiktoken")
+
+
+class TokenCounter:
+    """Count and truncate text in tokens of a BPE encoding, or heuristically without one."""
+
+    def __init__(self, encoding_name: Optional[str] = DEFAULT_ENCODING):
+        self.encoding = None
+        if encoding_name and tiktoken is not None:
+            try:
+                self.encoding = tiktoken.get_encoding(encoding_name)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.warning("Could not load tokenizer %s, using heuristic token counts: %s", encoding_name, e)
+
+    @staticmethod
+    def _heuristic_cost(piece: str) -> int:
+        return max(1, math.ceil(len(piece) / HEURISTIC_CHARS_PER_TOKEN))
+
+    def count(self, text: str) -> int:
+        """Return the number of tokens in a text."""
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return sum(self._heuristic_cost(match.group()) for match in HEURISTIC_TOKEN_PATTERN.finditer(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Return the longest prefix of a text that fits in max_tokens."""
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            if len(tokens) <= max_tokens:
+                return text
+            return self.encoding.decode(tokens[:max_tokens])
+
+        used = 0
+        for match in HEURISTIC_TOKEN_PATTERN.finditer(text):
+            used += self._heuristic_cost(match.group())
+            if used > max_tokens:
+                return text[:match.start()].rstrip()
+        return text
+
+
+def configure_tokenizer_cache(cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> None:
+    """Keep the tiktoken vocabulary in cache_dir, unless TIKTOKEN_CACHE_DIR is already set.
+
+    Must be called before the first token counter is created.
+    """
+    if cache_dir and tiktoken is not None:
+        os.environ.setdefault("TIKTOKEN_CACHE_DIR", cache_dir)
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(encoding_name: Optional[str] = DEFAULT_ENCODING) -> TokenCounter:
+    """Return the shared token counter for an encoding."""
+    return TokenCounter(encoding_name)
+
+
+def allocate_budget(sizes: List[int], budget: int) -> List[int]:
+    """Split a token budget across blocks by water-filling.
+
+    Blocks smaller than an equal share keep their full size and the rest of
+    the budget is shared among the larger blocks.
+    """
+    allocations = list(sizes)
+    remaining = max(0, budget)
+    order = sorted(range(len(sizes)), key=lambda index: sizes[index])
+    for position, index in enumerate(order):
+        share = remaining // (len(order) - position)
+        allocations[index] = min(sizes[index], share)
+        remaining -= allocations[index]
+    return allocations
+
+
+def fair_truncate(prefix: str, blocks: List[str], max_tokens: int, counter: TokenCounter,
+                  separator: str = "\n") -> str:
+    """Join a prefix and blocks, truncating each block to a fair share of max_tokens if needed."""
+    combined = prefix + separator.join(blocks)
+    if counter.count(combined) <= max_tokens:
+        return combined
+
+    overhead = counter.count(prefix) + counter.count(separator) * max(0, len(blocks) - 1)
+    sizes = [counter.count(block) for block in blocks]
+    allocations = allocate_budget(sizes, max_tokens - overhead)
+    truncated = [
+        block if allocation >= size else counter.truncate(block, allocation)
+        for block, size, allocation in zip(blocks, sizes, allocations)
+    ]
+    logger.info("Truncated prompt from %d to about %d tokens across %d sources",
+                overhead + sum(sizes), overhead + sum(allocations), len(blocks))
+    return prefix + separator.join(truncated)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Group Scoring Benchmark for UglyFeed
+
+Compares the per-group similarity scoring used by main.py against the
+original pure-Python implementation (one scan over all n x n pairs for every
+label) on synthetic similarity matrices, checks that both produce the same
+groups and scores, and reports the speedup.
+
+Usage:
+    python tools/benchmark_grouping.py
+    python tools/benchmark_grouping.py --sizes 500 1000 2000 --group-size 4
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import score_groups  # noqa: E402  pylint: disable=wrong-import-position
+
+
+def legacy_score_groups(similarity_matrix: np.ndarray, labels: np.ndarray) -> List[Tuple[List[int], float]]:
+    """Original scoring loop from aggregate_similar_articles, kept as the reference."""
+    n = len(labels)
+    scores = []
+    for label in set(labels):
+        members = [i for i in range(n) if labels[i] == label]
+        group_similarities = [similarity_matrix[i][j] for i in range(n) for j in range(n)
+                              if labels[i] == label and labels[j] == label and i != j]
+        scores.append((members, np.mean(group_similarities) if group_similarities else 0))
+    return scores
+
+
+def make_problem(n: int, group_size: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Build a symmetric similarity matrix and a random labelling with the given mean group size."""
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, max(1, n // group_size), size=n)
+    similarity = rng.random((n, n))
+    similarity = (similarity + similarity.T) / 2
+    np.fill_diagonal(similarity, 1.0)
+    return similarity, labels
+
+
+def time_call(func, *args) -> Tuple[float, object]:
+    """Return (elapsed seconds, result) for a single call."""
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    """Run the benchmark for each requested size."""
+    parser = argparse.ArgumentParser(description='Benchmark group similarity scoring.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 250, 500],
+                        help='Number of articles to benchmark (default: 100 250 500)')
+    parser.add_argument('--group-size', type=int, default=3, help='Mean number of articles per group')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    args = parser.parse_args()
+
+    print(f"{'articles':>10} {'groups':>8} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for n in args.sizes:
+        similarity, labels = make_problem(n, args.group_size, args.seed)
+        legacy_time, legacy = time_call(legacy_score_groups, similarity, labels)
+        new_time, current = time_call(score_groups, similarity, labels)
+
+        if len(legacy) != len(current):
+            print(f"❌ Group count mismatch for n={n}: {len(legacy)} vs {len(current)}")
+            sys.exit(1)
+        for (old_members, old_score), (new_members, new_score) in zip(legacy, current):
+            if list(old_members) != list(new_members) or not np.isclose(old_score, new_score):
+                print(f"❌ Results differ for n={n}")
+                sys.exit(1)
+
+        print(f"{n:>10} {len(current):>8} {legacy_time:>12.3f} {new_time:>15.4f} {legacy_time / new_time:>8.0f}x")
+
+    print("✅ Vectorized scoring matches the legacy implementation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+LLM Processor Load Test for UglyFeed
+
+Runs llm_processor.py against the bundled mock LLM server (or any server given
+with --url) on a set of synthetic group files, once per concurrency level, and
+reports throughput, p50/p99 latency per group, how many extra requests
+(retries after 429 or server errors) were sent and how many groups failed.
+
+Usage:
+    python tools/llm_benchmark.py
+    python tools/llm_benchmark.py --groups 60 --concurrency 1 4 8 16 --latency 0.5 --rate-limit-rate 0.05
+    python tools/llm_benchmark.py --provider ollama --stream
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import requests
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import llm_processor  # noqa: E402  pylint: disable=wrong-import-position
+from mock_llm_server import MockSettings, create_server  # noqa: E402  pylint: disable=wrong-import-position
+
+# selected_api name and endpoint path below the server URL of each provider
+PROVIDERS = {
+    'openai': ('OpenAI', '/v1/chat/completions'),
+    'anthropic': ('Anthropic', '/v1/messages'),
+    'ollama': ('Ollama', '/api/chat'),
+    'gemini': ('Gemini', '/v1beta/models/{model}:generateContent'),
+}
+
+
+def write_groups(folder: Path, count: int, sources: int) -> None:
+    """Write synthetic group files shaped like the ones produced by main.py."""
+    folder.mkdir(parents=True, exist_ok=True)
+    for index in range(count):
+        articles = [
+            {
+                'title': f"Benchmark story {index} from source {source}",
+                'content': f"Story {index} as told by source {source}. " * 40,
+                'link': f"https://source{source}.example.com/story-{index}"
+            }
+            for source in range(sources)
+        ]
+        with open(folder / f"group_{index + 1}.json", 'w', encoding='utf-8') as file:
+            json.dump({'articles': articles}, file)
+
+
+def write_config(path: Path, provider: str, base_url: str, workdir: Path, stream: bool) -> None:
+    """Write an llm_processor config pointing at the server, with caching and skipping disabled."""
+    selected_api, endpoint = PROVIDERS[provider]
+    config = {
+        'api_config': {
+            'selected_api': selected_api,
+            f'{provider}_api_key': 'benchmark',
+            f'{provider}_model': 'mock-model',
+            f'{provider}_api_url': base_url.rstrip('/') + endpoint,
+        },
+        'llm_processing': {'skip_unchanged': False, 'streaming': stream, 'stream_deadline': 60},
+        'llm_cache': {'enabled': False},
+        'folders': {'output_folder': str(workdir / 'output'), 'rewritten_folder': str(workdir / 'rewritten')},
+        'content_prefix': "Rewrite the following sources as one article:\n",
+    }
+    with open(path, 'w', encoding='utf-8') as file:
+        yaml.safe_dump(config, file)
+
+
+def run_level(config_path: Path, concurrency: int, base_url: str) -> Dict[str, Any]:
+    """Run the processor once and collect per-group latencies and server counters."""
+    latencies: List[float] = []
+    lock = threading.Lock()
+    original_complete = llm_processor.ProviderChain.complete
+
+    def timed_complete(chain, content):
+        start = time.perf_counter()
+        try:
+            return original_complete(chain, content)
+        finally:
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    requests.delete(f"{base_url}/stats", timeout=5)
+    llm_processor.ProviderChain.complete = timed_complete
+    try:
+        start = time.perf_counter()
+        llm_processor.main(str(config_path), max_in_flight=concurrency, force=True)
+        elapsed = time.perf_counter() - start
+    finally:
+        llm_processor.ProviderChain.complete = original_complete
+    stats = requests.get(f"{base_url}/stats", timeout=5).json()
+
+    return {
+        'elapsed': elapsed,
+        'latencies': latencies,
+        'stats': stats,
+    }
+
+
+def main():
+    """Run the load test for each concurrency level and print a summary table."""
+    parser = argparse.ArgumentParser(description='Load-test llm_processor.py against a mock LLM server.')
+    parser.add_argument('--provider', choices=sorted(PROVIDERS), default='openai', help='Wire format to use')
+    parser.add_argument('--url', help='Use an already running server instead of starting the bundled mock')
+    parser.add_argument('--groups', type=int, default=40, help='Number of synthetic groups')
+    parser.add_argument('--sources', type=int, default=3, help='Articles per group')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8], help='max_in_flight levels')
+    parser.add_argument('--stream', action='store_true', help='Use streaming completions')
+    parser.add_argument('--latency', type=float, default=0.2, help='Mock server mean latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.05, help='Mock server latency jitter in seconds')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of 429 answers')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of 500 answers')
+    parser.add_argument('--retry-after', type=float, default=0.5, help='Retry-After seconds of 429 answers')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for fault injection')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        settings = MockSettings(args.latency, args.jitter, args.rate_limit_rate, args.error_rate,
+                                args.retry_after, seed=args.seed)
+        server = create_server('127.0.0.1', 0, settings)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    base_url = base_url.rstrip('/')
+
+    print(f"🔧 {args.groups} groups x {args.sources} sources, provider {args.provider}, server {base_url}")
+    print(f"{'in flight':>10} {'time (s)':>10} {'groups/s':>10} {'p50 (s)':>9} {'p99 (s)':>9} "
+          f"{'requests':>9} {'retries':>8} {'429s':>6} {'errors':>7}")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            workdir = Path(tmp)
+            write_groups(workdir / 'output', args.groups, args.sources)
+            config_path = workdir / 'config.yaml'
+            write_config(config_path, args.provider, base_url, workdir, args.stream)
+
+            for concurrency in args.concurrency:
+                result = run_level(config_path, concurrency, base_url)
+                latencies = np.array(result['latencies']) if result['latencies'] else np.zeros(1)
+                stats = result['stats']
+                rewritten = len(list((workdir / 'rewritten').glob('*_rewritten.json')))
+                print(f"{concurrency:>10} {result['elapsed']:>10.2f} {rewritten / result['elapsed']:>10.2f} "
+                      f"{np.percentile(latencies, 50):>9.3f} {np.percentile(latencies, 99):>9.3f} "
+                      f"{stats['requests']:>9} {max(0, stats['requests'] - args.groups):>8} "
+                      f"{stats['rate_limited']:>6} {stats['errors']:>7}")
+                if rewritten < args.groups:
+                    print(f"⚠️  Only {rewritten} of {args.groups} groups were rewritten")
+                for output in (workdir / 'rewritten').glob('*.json'):
+                    output.unlink()
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
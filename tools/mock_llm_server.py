@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Mock LLM Server for UglyFeed
+
+A local stand-in for the LLM APIs used by llm_processor.py, so the processor
+can be exercised and benchmarked without spending real quota. It speaks the
+OpenAI-compatible, Anthropic, Ollama and Gemini wire formats, including their
+streaming variants, and can inject latency, 429 rate-limit answers and server
+errors.
+
+Routes (the API format is chosen from the path):
+    POST .../chat/completions                 OpenAI-compatible (SSE when "stream" is true)
+    POST .../messages                         Anthropic (SSE when "stream" is true)
+    POST .../api/chat                         Ollama (NDJSON unless "stream" is false)
+    POST .../models/<model>:generateContent   Gemini (:streamGenerateContent?alt=sse streams)
+    GET  /stats                               Request counters as JSON
+    DELETE /stats                             Reset the counters
+
+Usage:
+    python tools/mock_llm_server.py --port 8080
+    python tools/mock_llm_server.py --latency 0.5 --jitter 0.2 --rate-limit-rate 0.1 --error-rate 0.02
+
+Point llm_processor.py at it, e.g. with openai_api_url set to
+http://127.0.0.1:8080/v1/chat/completions or ollama_api_url set to
+http://127.0.0.1:8080/api/chat.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+GROUP_HEADER_PATTERN = re.compile(r"=== group (\S+) ===")
+SOURCE_PATTERN = re.compile(r"\[source \d+\]")
+
+
+class MockSettings:
+    """Fault and latency injection settings shared by all request handlers."""
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0, rate_limit_rate: float = 0.0,
+                 error_rate: float = 0.0, retry_after: float = 1.0, chunk_delay: float = 0.02,
+                 seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.chunk_delay = chunk_delay
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats: Dict[str, int] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        """Reset the request counters."""
+        with self.lock:
+            self.stats = {'requests': 0, 'completed': 0, 'rate_limited': 0, 'errors': 0}
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.stats[key] += 1
+
+    def draw(self) -> float:
+        """Draw a uniform random number in [0, 1)."""
+        with self.lock:
+            return self.random.random()
+
+    def delay(self) -> float:
+        """Return the simulated processing time of one request."""
+        with self.lock:
+            return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+
+def mock_completion(prompt: str) -> str:
+    """Build a deterministic answer; batched prompts get a JSON array keyed by group id."""
+    group_ids = GROUP_HEADER_PATTERN.findall(prompt)
+    if group_ids:
+        return json.dumps([
+            {'id': group_id, 'content': f"Mock rewrite of group {group_id}. It merges the sources of the group."}
+            for group_id in group_ids
+        ])
+    sources = len(SOURCE_PATTERN.findall(prompt)) or 1
+    return (f"Mock rewrite combining {sources} sources. The story is summarised in a few sentences. "
+            f"Details are kept neutral and accurate.")
+
+
+def request_prompt(body: Dict[str, Any]) -> str:
+    """Extract the prompt text from any of the supported request formats."""
+    if 'contents' in body:
+        return " ".join(part.get('text', '') for content in body['contents'] for part in content.get('parts', []))
+    messages = body.get('messages', [])
+    return " ".join(str(message.get('content', '')) for message in messages)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """Request handler answering in the API format selected by the path."""
+
+    protocol_version = 'HTTP/1.1'
+    settings: MockSettings = MockSettings()
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        if self.path.startswith('/stats'):
+            with self.settings.lock:
+                self.send_json(200, dict(self.settings.stats))
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def do_DELETE(self):  # pylint: disable=invalid-name
+        if self.path.startswith('/stats'):
+            self.settings.reset()
+            self.send_json(200, {'reset': True})
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        settings = self.settings
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except json.JSONDecodeError:
+            self.send_json(400, {'error': {'message': 'invalid JSON'}})
+            return
+        settings.count('requests')
+
+        api_format = self.api_format()
+        if api_format is None:
+            self.send_json(404, {'error': {'message': f'unknown route {self.path}'}})
+            return
+
+        draw = settings.draw()
+        if draw < settings.rate_limit_rate:
+            settings.count('rate_limited')
+            self.send_json(429, {'error': {'message': f'Rate limit reached. Please try again in '
+                                                      f'{settings.retry_after}s.', 'code': 'rate_limit_exceeded'}},
+                           headers={'Retry-After': str(settings.retry_after)})
+            return
+        if draw < settings.rate_limit_rate + settings.error_rate:
+            settings.count('errors')
+            time.sleep(settings.delay())
+            self.send_json(500, {'error': {'message': 'injected server error'}})
+            return
+
+        text = mock_completion(request_prompt(body))
+        streaming = ('streamGenerateContent' in self.path if api_format == 'gemini'
+                     else body.get('stream', api_format == 'ollama'))
+        if streaming:
+            self.stream(api_format, text, settings)
+        else:
+            time.sleep(settings.delay())
+            self.send_json(200, self.full_response(api_format, text, body.get('model', 'mock')))
+        settings.count('completed')
+
+    def api_format(self) -> Optional[str]:
+        path = self.path.split('?', 1)[0]
+        if path.endswith('/chat/completions'):
+            return 'openai'
+        if path.endswith('/messages'):
+            return 'anthropic'
+        if path.endswith('/api/chat'):
+            return 'ollama'
+        if path.endswith(':generateContent') or path.endswith(':streamGenerateContent'):
+            return 'gemini'
+        return None
+
+    @staticmethod
+    def full_response(api_format: str, text: str, model: str) -> Dict[str, Any]:
+        if api_format == 'anthropic':
+            return {'id': 'msg_mock', 'type': 'message', 'role': 'assistant', 'model': model,
+                    'content': [{'type': 'text', 'text': text}], 'stop_reason': 'end_turn'}
+        if api_format == 'ollama':
+            return {'model': model, 'message': {'role': 'assistant', 'content': text}, 'done': True}
+        if api_format == 'gemini':
+            return {'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]},
+                                    'finishReason': 'STOP'}]}
+        return {'id': 'chatcmpl-mock', 'object': 'chat.completion', 'created': int(time.time()), 'model': model,
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': text}}],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}}
+
+    @staticmethod
+    def stream_events(api_format: str, pieces: List[str]) -> List[str]:
+        if api_format == 'ollama':
+            events = [json.dumps({'message': {'role': 'assistant', 'content': piece}, 'done': False}) + "\n"
+                      for piece in pieces]
+            return events + [json.dumps({'message': {'role': 'assistant', 'content': ''}, 'done': True}) + "\n"]
+        if api_format == 'anthropic':
+            events = ["event: message_start\ndata: " + json.dumps({'type': 'message_start'}) + "\n\n"]
+            events += ["event: content_block_delta\ndata: " + json.dumps(
+                {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': piece}}
+            ) + "\n\n" for piece in pieces]
+            return events + ["event: message_stop\ndata: " + json.dumps({'type': 'message_stop'}) + "\n\n"]
+        if api_format == 'gemini':
+            return ["data: " + json.dumps({'candidates': [{'content': {'role': 'model', 'parts': [{'text': piece}]}}]})
+                    + "\n\n" for piece in pieces]
+        events = ["data: " + json.dumps({'choices': [{'index': 0, 'delta': {'content': piece}}]}) + "\n\n"
+                  for piece in pieces]
+        return events + ["data: [DONE]\n\n"]
+
+    def stream(self, api_format: str, text: str, settings: MockSettings) -> None:
+        """Send the answer word by word as a chunked SSE or NDJSON stream."""
+        time.sleep(settings.delay())
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson' if api_format == 'ollama' else 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        pieces = [word + ' ' for word in text.split(' ')]
+        try:
+            for event in self.stream_events(api_format, pieces):
+                data = event.encode('utf-8')
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+                self.wfile.flush()
+                time.sleep(settings.chunk_delay)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def create_server(host: str = '127.0.0.1', port: int = 8080, settings: Optional[MockSettings] = None) -> ThreadingHTTPServer:
+    """Create (but do not start) a mock server; port 0 picks a free port."""
+    handler = type('ConfiguredMockLLMHandler', (MockLLMHandler,), {'settings': settings or MockSettings()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    """Parse arguments and serve until interrupted."""
+    parser = argparse.ArgumentParser(description='Mock LLM server speaking OpenAI, Anthropic, Ollama and Gemini formats.')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on (default: 8080)')
+    parser.add_argument('--latency', type=float, default=0.2, help='Mean seconds before answering')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Uniform +/- jitter added to the latency')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of requests answered with 429')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 500')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After seconds sent with 429 answers')
+    parser.add_argument('--chunk-delay', type=float, default=0.02, help='Seconds between streamed chunks')
+    parser.add_argument('--seed', type=int, help='Random seed for reproducible fault injection')
+    args = parser.parse_args()
+
+    settings = MockSettings(args.latency, args.jitter, args.rate_limit_rate, args.error_rate,
+                            args.retry_after, args.chunk_delay, args.seed)
+    server = create_server(args.host, args.port, settings)
+    print(f"🤖 Mock LLM server listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping mock server")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,10 @@ from datetime import datetime
 # Define directory paths and filenames
 UGLYFEEDS_DIR = Path("uglyfeeds")
 UGLYFEED_FILE = "uglyfeed.xml"
+# Extensions of the feed outputs and of their precompressed siblings
+FEED_OUTPUT_EXTENSIONS = (".xml", ".atom", ".json")
+COMPRESSED_EXTENSIONS = (".br", ".gz")
+FEED_INDEX_SUFFIX = ".index.json"
 
 def get_local_ip():
     """Get the local IP address."""
@@ -32,6 +36,21 @@ def find_available_port(base_port):
             except OSError:
                 base_port += 1
 
+def list_feed_outputs(directory=UGLYFEEDS_DIR):
+    """List the main and shard feed outputs in a directory, compressed siblings included."""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    outputs = []
+    for path in sorted(directory.iterdir()):
+        name = path.name
+        if name.endswith(COMPRESSED_EXTENSIONS):
+            name = name[:-len(Path(name).suffix)]
+        # The sidecar indexes are internal to json2rss
+        if path.is_file() and name.endswith(FEED_OUTPUT_EXTENSIONS) and not name.endswith(FEED_INDEX_SUFFIX):
+            outputs.append(path)
+    return outputs
+
 def get_xml_item_count():
     """Get the current count of items in the XML."""
     if not (UGLYFEEDS_DIR / UGLYFEED_FILE).exists():